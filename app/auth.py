@@ -16,6 +16,22 @@ JWT_EXPIRY_HOURS = 24
 
 security = HTTPBearer()
 
+def _is_uuid(value: Any) -> bool:
+    """Cheap canonical UUID check for ids taken from token claims"""
+    if not isinstance(value, str) or len(value) != 36:
+        return False
+    if value[8] != '-' or value[13] != '-' or value[18] != '-' or value[23] != '-':
+        return False
+    digits = value.replace('-', '', 4)
+    # isalnum() rules out the '_', '+' and whitespace that int() would accept
+    if not (digits.isascii() and digits.isalnum()):
+        return False
+    try:
+        int(digits, 16)
+    except ValueError:
+        return False
+    return True
+
 class AuthError(Exception):
     """Custom authentication error"""
     pass
@@ -99,6 +115,10 @@ def get_current_tenant_context(
         if not tenant_id or not user_id:
             raise AuthError("Invalid token payload")
         
+        # Reject malformed ids before they reach the UUID columns
+        if not _is_uuid(tenant_id) or not _is_uuid(user_id):
+            raise AuthError("Invalid token payload")
+        
         # Verify tenant exists and is active
         tenant = db.query(Tenant).filter(
             Tenant.id == tenant_id,
@@ -6,7 +6,20 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from app.models import Branch, Message, Memory, Summary
-from app.schemas import MemoryDiff, SummaryDiff, MessageRange, DiffMode
+from app.schemas import MemoryDiff, MemoryEntry, MemoryChange, SummaryDiff, MessageRange, DiffMode
+
+
+def _memory_entry(memory: Memory, diff_type: str) -> MemoryEntry:
+    """Build the diff entry for a memory present on only one side."""
+    return MemoryEntry(
+        key=memory.key,
+        value=memory.value,
+        memory_type=memory.memory_type,
+        confidence=memory.confidence,
+        source=memory.source,
+        created_at=memory.created_at.isoformat(),
+        diff_type=diff_type
+    )
 
 
 def compute_memory_diff(
@@ -59,26 +72,10 @@ def compute_memory_diff(
             # Check if it's truly new (not in base) or if it was removed from left
             if base_branch_id and key in base_memory_map:
                 # Was in base, removed from left, still in right
-                removed.append({
-                    "key": key,
-                    "value": memory.value,
-                    "memory_type": memory.memory_type,
-                    "confidence": memory.confidence,
-                    "source": memory.source,
-                    "created_at": memory.created_at.isoformat(),
-                    "diff_type": "removed_from_left"
-                })
+                removed.append(_memory_entry(memory, "removed_from_left"))
             else:
                 # Truly new memory
-                added.append({
-                    "key": key,
-                    "value": memory.value,
-                    "memory_type": memory.memory_type,
-                    "confidence": memory.confidence,
-                    "source": memory.source,
-                    "created_at": memory.created_at.isoformat(),
-                    "diff_type": "added"
-                })
+                added.append(_memory_entry(memory, "added"))
     
     # Find removed memories (in left but not in right)
     for key, memory in left_memory_map.items():
@@ -86,29 +83,13 @@ def compute_memory_diff(
             # Check if it was in base
             if base_branch_id and key in base_memory_map:
                 # Was in base, removed from right, still in left
-                removed.append({
-                    "key": key,
-                    "value": memory.value,
-                    "memory_type": memory.memory_type,
-                    "confidence": memory.confidence,
-                    "source": memory.source,
-                    "created_at": memory.created_at.isoformat(),
-                    "diff_type": "removed_from_right"
-                })
+                removed.append(_memory_entry(memory, "removed_from_right"))
             else:
                 # Was added to left, removed from right
-                removed.append({
-                    "key": key,
-                    "value": memory.value,
-                    "memory_type": memory.memory_type,
-                    "confidence": memory.confidence,
-                    "source": memory.source,
-                    "created_at": memory.created_at.isoformat(),
-                    "diff_type": "removed"
-                })
+                removed.append(_memory_entry(memory, "removed"))
     
     # Find modified memories (in both but different)
-    for key in set(left_memory_map.keys()) & set(right_memory_map.keys()):
+    for key in left_memory_map.keys() & right_memory_map.keys():
         left_memory = left_memory_map[key]
         right_memory = right_memory_map[key]
         
@@ -126,19 +107,19 @@ def compute_memory_diff(
                                right_memory.confidence != base_memory.confidence)
                 is_conflict = left_changed and right_changed
             
-            memory_diff = {
-                "key": key,
-                "left_value": left_memory.value,
-                "right_value": right_memory.value,
-                "memory_type": left_memory.memory_type,
-                "left_confidence": left_memory.confidence,
-                "right_confidence": right_memory.confidence,
-                "left_source": left_memory.source,
-                "right_source": right_memory.source,
-                "left_updated": left_memory.updated_at.isoformat(),
-                "right_updated": right_memory.updated_at.isoformat(),
-                "is_conflict": is_conflict
-            }
+            memory_diff = MemoryChange(
+                key=key,
+                left_value=left_memory.value,
+                right_value=right_memory.value,
+                memory_type=left_memory.memory_type,
+                left_confidence=left_memory.confidence,
+                right_confidence=right_memory.confidence,
+                left_source=left_memory.source,
+                right_source=right_memory.source,
+                left_updated=left_memory.updated_at.isoformat(),
+                right_updated=right_memory.updated_at.isoformat(),
+                is_conflict=is_conflict
+            )
             
             if is_conflict:
                 conflicts.append(memory_diff)
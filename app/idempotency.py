@@ -4,13 +4,18 @@ from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 from datetime import datetime, timedelta
 import json
+import re
 from uuid import uuid4
 
+# Compiled once; every message and merge request (including retries) checks its key
+_IDEMPOTENCY_KEY_RE = re.compile(r'^[a-zA-Z0-9_-]+$')
+
 class IdempotencyKey:
-    def __init__(self, db: Session, key: str, operation: str, ttl_hours: int = 24):
+    def __init__(self, db: Session, key: str, operation: str, tenant_id: str, ttl_hours: int = 24):
         self.db = db
         self.key = key
         self.operation = operation
+        self.tenant_id = tenant_id
         self.ttl_hours = ttl_hours
         self._result = None
         self._processed = False
@@ -24,6 +29,7 @@ class IdempotencyKey:
         
         # Check for existing record
         existing = self.db.query(IdempotencyRecord).filter(
+            IdempotencyRecord.tenant_id == self.tenant_id,
             IdempotencyRecord.key == self.key,
             IdempotencyRecord.operation == self.operation
         ).first()
@@ -46,6 +52,7 @@ class IdempotencyKey:
         try:
             record = IdempotencyRecord(
                 id=str(uuid4()),
+                tenant_id=self.tenant_id,
                 key=self.key,
                 operation=self.operation,
                 result=None,
@@ -68,6 +75,7 @@ class IdempotencyKey:
         from app.models import IdempotencyRecord
         
         record = self.db.query(IdempotencyRecord).filter(
+            IdempotencyRecord.tenant_id == self.tenant_id,
             IdempotencyRecord.key == self.key,
             IdempotencyRecord.operation == self.operation
         ).first()
@@ -78,6 +86,21 @@ class IdempotencyKey:
             self.db.commit()
             self._result = result
 
+    def release(self) -> None:
+        """Drop the placeholder of an operation that was rejected, so the key can be retried."""
+        if not self._processed:
+            return
+        
+        from app.models import IdempotencyRecord
+        
+        self.db.query(IdempotencyRecord).filter(
+            IdempotencyRecord.tenant_id == self.tenant_id,
+            IdempotencyRecord.key == self.key,
+            IdempotencyRecord.operation == self.operation
+        ).delete(synchronize_session=False)
+        self.db.commit()
+        self._processed = False
+
     def get_result(self) -> Optional[Dict[str, Any]]:
         """Get the stored result."""
         return self._result
@@ -88,6 +111,5 @@ def validate_idempotency_key(key: str) -> None:
         raise HTTPException(400, "Idempotency key must be between 10 and 100 characters")
     
     # Check for reasonable format (alphanumeric, hyphens, underscores)
-    import re
-    if not re.match(r'^[a-zA-Z0-9_-]+$', key):
+    if not _IDEMPOTENCY_KEY_RE.match(key):
         raise HTTPException(400, "Idempotency key can only contain alphanumeric characters, hyphens, and underscores")
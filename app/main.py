@@ -1,5 +1,5 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import threads, branches, messages, merges, diff, edges, auth, usage, context
 
@@ -30,6 +30,8 @@ app = FastAPI(
     List endpoints support cursor-based pagination using the `cursor` and `limit` query parameters.
     """,
     version="0.1.0",
+    # orjson renders response bodies in C instead of the stdlib json encoder
+    default_response_class=ORJSONResponse,
     contact={
         "name": "ConvoHub API Support",
         "email": "support@convohub.com",
@@ -117,7 +119,7 @@ def get_openapi():
 # Global exception handler
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "error": exc.detail,
@@ -12,12 +12,15 @@ def build_ancestor_set(db: Session, tip_id: str) -> set[str]:
         cur = db.get(Message, cur.parent_message_id)
     return seen
 
-def find_lca(db: Session, a_tip: str, b_tip: str) -> Optional[str]:
-    # First try exact ID matching
-    a_anc = build_ancestor_set(db, a_tip)
-    cur = db.get(Message, b_tip)
+def find_lca(db: Session, a_tip: str, b_tip: str, b_ancestors: Optional[set[str]] = None) -> Optional[str]:
+    # First try exact ID matching; with b's ancestry already known (e.g. one
+    # target merged into repeatedly) walk a's chain against it instead
+    if b_ancestors is None:
+        ancestors, cur = build_ancestor_set(db, a_tip), db.get(Message, b_tip)
+    else:
+        ancestors, cur = b_ancestors, db.get(Message, a_tip)
     while cur:
-        if cur.id in a_anc:
+        if cur.id in ancestors:
             return cur.id
         if not cur.parent_message_id:
             break
@@ -1,7 +1,7 @@
 # app/models.py
 import uuid, datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, CheckConstraint, JSON, Text, Boolean, Index, UniqueConstraint, Integer, Date
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, DateTime, ForeignKey, CheckConstraint, JSON, Text, Boolean, Index, UniqueConstraint, Integer, Date, DDL, event
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from app.db import Base
 
@@ -168,8 +168,8 @@ class Message(Base):
     
     # Content
     role = Column(String(20), nullable=False)  # user, assistant, system, tool
-    content = Column(JSON, nullable=False)
-    state_snapshot = Column(JSON, nullable=True)
+    content = Column(JSONB, nullable=False)
+    state_snapshot = Column(JSONB, nullable=True)
     
     # Metadata
     origin = Column(String(20), nullable=False, default="live")  # live, merge, import
@@ -202,8 +202,9 @@ class Message(Base):
         CheckConstraint("role IN ('user','assistant','system','tool')", name="ck_message_role"),
         CheckConstraint("origin IN ('live','merge','import')", name="ck_message_origin"),
         Index('ix_messages_tenant_branch', 'tenant_id', 'branch_id'),
-        Index('ix_messages_branch_created', 'branch_id', 'created_at'),
+        Index('ix_messages_branch_created', 'branch_id', 'created_at', 'id'),
         Index('ix_messages_parent', 'parent_message_id'),
+        Index('ix_messages_content_gin', 'content', postgresql_using='gin'),
     )
 
 
@@ -253,7 +254,7 @@ class Merge(Base):
     merged_into_message_id = Column(UUID(as_uuid=False), ForeignKey("messages.id"), nullable=True)
     
     # Merge metadata
-    summary = Column(JSON, nullable=True)
+    summary = Column(JSONB, nullable=True)
     conflict_resolution = Column(JSON, nullable=True)  # How conflicts were resolved
     created_at = Column(DateTime, default=now, nullable=False)
     updated_at = Column(DateTime, default=now, onupdate=now, nullable=False)
@@ -370,7 +371,8 @@ class UsageRecord(Base):
     user_id = Column(UUID(as_uuid=False), ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
     usage_type = Column(String(50), nullable=False)  # messages_per_day, merges_per_day, etc.
     count = Column(Integer, nullable=False, default=1)
-    date = Column(Date, nullable=False)  # Date for daily quotas
+    # Date for daily quotas; also the partition key, so it is part of the PK
+    date = Column(Date, primary_key=True, nullable=False)
     created_at = Column(DateTime, default=now, nullable=False)
     updated_at = Column(DateTime, default=now, onupdate=now, nullable=False)
 
@@ -380,8 +382,24 @@ class UsageRecord(Base):
 
     __table_args__ = (
         CheckConstraint("count >= 0", name="ck_usage_count_positive"),
-        UniqueConstraint('tenant_id', 'user_id', 'usage_type', 'date', name='uq_usage_tenant_user_type_date'),
-        Index('ix_usage_tenant_type_date', 'tenant_id', 'usage_type', 'date'),
+        # NULLS NOT DISTINCT: the tenant-level row (user_id NULL) is a single
+        # counter that upserts bump like any per-user row
+        UniqueConstraint('tenant_id', 'user_id', 'usage_type', 'date', name='uq_usage_tenant_user_type_date',
+                         postgresql_nulls_not_distinct=True),
+        # Covers get_usage(): equality/range columns first, count carried in
+        # the leaf so the SUM is an index-only scan
+        Index('ix_usage_lookup', 'tenant_id', 'usage_type', 'date', 'user_id', postgresql_include=['count']),
         Index('ix_usage_user_type_date', 'user_id', 'usage_type', 'date'),
         Index('ix_usage_date', 'date'),
+        # Daily partitions (usage_records_YYYYMMDD) so retention drops whole
+        # tables; see UsageTracker.cleanup_old_records
+        {'postgresql_partition_by': 'RANGE (date)'},
     )
+
+# Catch-all for days without their own partition yet, so inserts never fail
+event.listen(
+    UsageRecord.__table__,
+    "after_create",
+    DDL("CREATE TABLE usage_records_default PARTITION OF usage_records DEFAULT")
+    .execute_if(dialect="postgresql"),
+)
@@ -4,7 +4,7 @@ from typing import Dict, Optional, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from fastapi import HTTPException, status
+from fastapi import HTTPException, Request, status
 from app.models import Tenant, User
 from app.auth import TenantContext
 
@@ -241,6 +241,31 @@ class QuotaManager:
                 "storage_mb": 10240,  # 10GB
             }
         }
+        # tenant_id -> (expires_at, plan). Plans change rarely, so a short TTL
+        # spares the Tenant lookup on every quota check
+        self.plan_ttl = 10.0
+        self._plan_cache: Dict[str, Tuple[float, str]] = {}
+    
+    def get_tenant_plan(self, db: Session, tenant_id: str) -> str:
+        """
+        Get a tenant's plan name, cached for plan_ttl seconds.
+        
+        Args:
+            db: Database session
+            tenant_id: Tenant identifier
+            
+        Returns:
+            str: Plan name ("default" for unknown tenants)
+        """
+        now = time.monotonic()
+        cached = self._plan_cache.get(tenant_id)
+        if cached and cached[0] > now:
+            return cached[1]
+        
+        settings = db.query(Tenant.settings).filter(Tenant.id == tenant_id).scalar() or {}
+        plan = settings.get("plan", "default")
+        self._plan_cache[tenant_id] = (now + self.plan_ttl, plan)
+        return plan
     
     def get_tenant_quota(self, db: Session, tenant_id: str, quota_type: str) -> int:
         """
@@ -254,16 +279,23 @@ class QuotaManager:
         Returns:
             int: Quota value
         """
-        tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
-        if not tenant:
-            return self.quotas["default"][quota_type]
-        
-        # Get quota from tenant settings
-        settings = tenant.settings or {}
-        plan = settings.get("plan", "default")
-        
+        plan = self.get_tenant_plan(db, tenant_id)
         return self.quotas.get(plan, self.quotas["default"]).get(quota_type, 0)
     
+    def get_tenant_quotas(self, db: Session, tenant_id: str) -> Dict[str, int]:
+        """
+        Get every quota for a tenant's plan with a single lookup.
+        
+        Args:
+            db: Database session
+            tenant_id: Tenant identifier
+            
+        Returns:
+            Dict[str, int]: Quota values keyed by quota type
+        """
+        plan = self.get_tenant_plan(db, tenant_id)
+        return self.quotas.get(plan, self.quotas["default"])
+    
     def check_quota(self, db: Session, tenant_id: str, quota_type: str, current_usage: int) -> bool:
         """
         Check if quota is exceeded.
@@ -326,15 +358,55 @@ class RateLimitMiddleware:
         
         # Check quota if specified
         if quota_type:
-            quota_ok = self.quota_manager.check_quota(db, context.tenant_id, quota_type, current_usage)
-            if not quota_ok:
-                quota = self.quota_manager.get_tenant_quota(db, context.tenant_id, quota_type)
+            quota = self.quota_manager.get_tenant_quota(db, context.tenant_id, quota_type)
+            if current_usage >= quota:
                 raise HTTPException(
                     status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                     detail=f"Quota exceeded for {quota_type}. Limit: {quota}, Current: {current_usage}",
                     headers={"Retry-After": "86400"}  # 24 hours
                 )
 
+    
+    def consume_quota(
+        self,
+        db: Session,
+        context: TenantContext,
+        quota_type: str,
+        count: int = 1,
+        as_of=None,
+        request: Optional[Request] = None
+    ) -> None:
+        """
+        Count usage against a quota, atomically with the quota check.
+        
+        Runs as part of the caller's transaction, so the usage is only kept
+        if the caller commits.
+        
+        Args:
+            db: Database session
+            context: Tenant context
+            quota_type: Quota type to count against
+            count: Amount of usage
+            as_of: Day to account against; defaults to today
+            request: Current request; the resulting usage and quota are kept
+                on request.state.rate_limit for RateLimitHeaders
+            
+        Raises:
+            HTTPException: If the usage would exceed the quota
+        """
+        from app.usage_tracker import UsageTracker
+        
+        if not UsageTracker.check_and_increment_usage(
+            db, context.tenant_id, quota_type, context.user_id, count,
+            as_of=as_of, request=request
+        ):
+            quota = self.quota_manager.get_tenant_quota(db, context.tenant_id, quota_type)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Quota exceeded for {quota_type}. Limit: {quota}",
+                headers={"Retry-After": "86400"}  # 24 hours
+            )
+
 
 # Global rate limiter instance
 rate_limiter = RateLimiter()
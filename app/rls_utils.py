@@ -4,122 +4,11 @@ from sqlalchemy import text
 from app.models import ThreadCollaborator
 
 class RLSManager:
-    """Manages PostgreSQL Row-Level Security policies"""
+    """
+    Applies the session settings PostgreSQL Row-Level Security policies read.
     
-    @staticmethod
-    def enable_rls_on_table(db: Session, table_name: str) -> None:
-        """
-        Enable RLS on a table.
-        
-        Args:
-            db: Database session
-            table_name: Name of the table
-        """
-        db.execute(text(f"ALTER TABLE {table_name} ENABLE ROW LEVEL SECURITY"))
-        db.commit()
-    
-    @staticmethod
-    def create_tenant_policy(db: Session, table_name: str, policy_name: str) -> None:
-        """
-        Create a tenant-based RLS policy.
-        
-        Args:
-            db: Database session
-            table_name: Name of the table
-            policy_name: Name of the policy
-        """
-        policy_sql = f"""
-        CREATE POLICY {policy_name} ON {table_name}
-        FOR ALL
-        USING (tenant_id = current_setting('app.current_tenant_id')::uuid)
-        WITH CHECK (tenant_id = current_setting('app.current_tenant_id')::uuid)
-        """
-        db.execute(text(policy_sql))
-        db.commit()
-    
-    @staticmethod
-    def create_thread_access_policy(db: Session, table_name: str, policy_name: str) -> None:
-        """
-        Create a thread-based access policy for tables that reference threads.
-        
-        Args:
-            db: Database session
-            table_name: Name of the table
-            policy_name: Name of the policy
-        """
-        policy_sql = f"""
-        CREATE POLICY {policy_name} ON {table_name}
-        FOR ALL
-        USING (
-            EXISTS (
-                SELECT 1 FROM threads t
-                LEFT JOIN thread_collaborators tc ON t.id = tc.thread_id
-                WHERE t.id = {table_name}.thread_id
-                AND (
-                    t.owner_id = current_setting('app.current_user_id')::uuid
-                    OR tc.user_id = current_setting('app.current_user_id')::uuid
-                )
-                AND t.tenant_id = current_setting('app.current_tenant_id')::uuid
-            )
-        )
-        WITH CHECK (
-            EXISTS (
-                SELECT 1 FROM threads t
-                LEFT JOIN thread_collaborators tc ON t.id = tc.thread_id
-                WHERE t.id = {table_name}.thread_id
-                AND (
-                    t.owner_id = current_setting('app.current_user_id')::uuid
-                    OR tc.user_id = current_setting('app.current_user_id')::uuid
-                )
-                AND t.tenant_id = current_setting('app.current_tenant_id')::uuid
-            )
-        )
-        """
-        db.execute(text(policy_sql))
-        db.commit()
-    
-    @staticmethod
-    def create_branch_access_policy(db: Session, table_name: str, policy_name: str) -> None:
-        """
-        Create a branch-based access policy for tables that reference branches.
-        
-        Args:
-            db: Database session
-            table_name: Name of the table
-            policy_name: Name of the policy
-        """
-        policy_sql = f"""
-        CREATE POLICY {policy_name} ON {table_name}
-        FOR ALL
-        USING (
-            EXISTS (
-                SELECT 1 FROM branches b
-                JOIN threads t ON b.thread_id = t.id
-                LEFT JOIN thread_collaborators tc ON t.id = tc.thread_id
-                WHERE b.id = {table_name}.branch_id
-                AND (
-                    t.owner_id = current_setting('app.current_user_id')::uuid
-                    OR tc.user_id = current_setting('app.current_user_id')::uuid
-                )
-                AND b.tenant_id = current_setting('app.current_tenant_id')::uuid
-            )
-        )
-        WITH CHECK (
-            EXISTS (
-                SELECT 1 FROM branches b
-                JOIN threads t ON b.thread_id = t.id
-                LEFT JOIN thread_collaborators tc ON t.id = tc.thread_id
-                WHERE b.id = {table_name}.branch_id
-                AND (
-                    t.owner_id = current_setting('app.current_user_id')::uuid
-                    OR tc.user_id = current_setting('app.current_user_id')::uuid
-                )
-                AND b.tenant_id = current_setting('app.current_tenant_id')::uuid
-            )
-        )
-        """
-        db.execute(text(policy_sql))
-        db.commit()
+    The policies themselves are defined in setup_rls.py.
+    """
     
     @staticmethod
     def set_current_tenant_and_user(db: Session, tenant_id: str, user_id: str) -> None:
@@ -133,38 +22,6 @@ class RLSManager:
         """
         db.execute(text(f"SET app.current_tenant_id = '{tenant_id}'"))
         db.execute(text(f"SET app.current_user_id = '{user_id}'"))
-    
-    @staticmethod
-    def setup_rls_policies(db: Session) -> None:
-        """
-        Set up all RLS policies for the application.
-        
-        Args:
-            db: Database session
-        """
-        # Enable RLS on all tables
-        tables_with_tenant = [
-            'tenants', 'users', 'threads', 'branches', 'messages', 
-            'edges', 'merges', 'summaries', 'memories', 'idempotency_records'
-        ]
-        
-        for table in tables_with_tenant:
-            RLSManager.enable_rls_on_table(db, table)
-        
-        # Create tenant-based policies
-        tenant_tables = ['tenants', 'users', 'idempotency_records']
-        for table in tenant_tables:
-            RLSManager.create_tenant_policy(db, table, f"{table}_tenant_policy")
-        
-        # Create thread-based access policies
-        thread_tables = ['threads', 'thread_collaborators', 'merges', 'summaries', 'memories']
-        for table in thread_tables:
-            RLSManager.create_thread_access_policy(db, table, f"{table}_thread_policy")
-        
-        # Create branch-based access policies
-        branch_tables = ['branches', 'messages', 'edges']
-        for table in branch_tables:
-            RLSManager.create_branch_access_policy(db, table, f"{table}_branch_policy")
 
 
 class TenantAccessControl:
@@ -299,9 +299,11 @@ def add_thread_collaborator(
             detail="Access denied to thread"
         )
     
+    user_id = str(request.user_id)
+
     # Verify user exists in tenant
     user = db.query(User).filter(
-        User.id == request.user_id,
+        User.id == user_id,
         User.tenant_id == context.tenant_id,
         User.is_active == True
     ).first()
@@ -315,7 +317,7 @@ def add_thread_collaborator(
     # Check if collaborator already exists
     existing_collaborator = db.query(ThreadCollaborator).filter(
         ThreadCollaborator.thread_id == thread_id,
-        ThreadCollaborator.user_id == request.user_id,
+        ThreadCollaborator.user_id == user_id,
         ThreadCollaborator.tenant_id == context.tenant_id
     ).first()
     
@@ -329,7 +331,7 @@ def add_thread_collaborator(
         collaborator = ThreadCollaborator(
             id=str(uuid4()),
             thread_id=thread_id,
-            user_id=request.user_id,
+            user_id=user_id,
             tenant_id=context.tenant_id,
             role=request.role,
             permissions=request.permissions or [],
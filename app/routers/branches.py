@@ -95,9 +95,13 @@ def create_branch(
             detail="Thread not found"
         )
 
+    # Columns store UUIDs as strings
+    created_from_branch_id = str(body.created_from_branch_id) if body.created_from_branch_id else None
+    created_from_message_id = str(body.created_from_message_id) if body.created_from_message_id else None
+
     seed_snapshot = None
-    if body.created_from_message_id:
-        fork_msg = db.get(Message, body.created_from_message_id)
+    if created_from_message_id:
+        fork_msg = db.get(Message, created_from_message_id)
         if not fork_msg:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, 
@@ -107,15 +111,15 @@ def create_branch(
     
     # Copy messages from source branch if forking
     source_messages = []
-    if body.created_from_branch_id:
-        source_branch = db.get(Branch, body.created_from_branch_id)
+    if created_from_branch_id:
+        source_branch = db.get(Branch, created_from_branch_id)
         if not source_branch or source_branch.thread_id != thread_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, 
                 detail="created_from_branch_id not found or wrong thread"
             )
         source_messages = db.query(Message).filter(
-            Message.branch_id == body.created_from_branch_id
+            Message.branch_id == created_from_branch_id
         ).order_by(Message.created_at.asc()).all()
 
     try:
@@ -124,8 +128,8 @@ def create_branch(
             tenant_id=context.tenant_id,
             thread_id=thread_id,
             name=body.name,
-            created_from_branch_id=body.created_from_branch_id,
-            created_from_message_id=body.created_from_message_id,
+            created_from_branch_id=created_from_branch_id,
+            created_from_message_id=created_from_message_id,
             created_at=datetime.utcnow(),
         )
         b = Branch(
@@ -133,8 +137,8 @@ def create_branch(
             tenant_id=context.tenant_id,
             thread_id=thread_id,
             name=body.name,
-            created_from_branch_id=body.created_from_branch_id,
-            created_from_message_id=body.created_from_message_id,
+            created_from_branch_id=created_from_branch_id,
+            created_from_message_id=created_from_message_id,
             created_at=datetime.utcnow(),
         )
         db.add(b)
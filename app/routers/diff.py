@@ -1,10 +1,12 @@
 # app/routers/diff.py (enhanced router)
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from datetime import datetime
+import hashlib
 from typing import Optional
 from app.db import get_db
-from app.models import Branch, Message
+from app.models import Branch, Memory, Message, Summary
 from app.schemas import DiffResponse, DiffMode
 from app.merge_utils import find_lca, path_after, interleave_by_created_at
 from app.diff_utils import (
@@ -16,6 +18,53 @@ from app.diff_utils import (
 
 router = APIRouter(tags=["diff"])
 
+
+def _thread_state(db: Session, mode: DiffMode, thread_id: str) -> str:
+    """
+    Fingerprint the thread-level rows a summary or memory diff reads.
+    
+    Those rows belong to the whole thread, so a turn or merge on any other
+    branch can change them while both compared tips stay the same.
+    """
+    if mode == DiffMode.MEMORY:
+        query = db.query(func.count(Memory.id), func.max(Memory.updated_at)).filter(
+            Memory.thread_id == thread_id
+        )
+    elif mode == DiffMode.SUMMARY:
+        query = db.query(func.count(Summary.id), func.max(Summary.updated_at)).filter(
+            Summary.thread_id == thread_id,
+            Summary.is_current == True
+        )
+    else:
+        return ""
+    count, latest = query.one()
+    return f"{count}:{latest.isoformat() if latest else ''}"
+
+
+def _diff_etag(mode: DiffMode, left_tip_id: str, right_tip_id: str, thread_state: str = "") -> str:
+    """
+    Weak ETag for a diff, derived from both branch tips and the thread state.
+    
+    The ETag is weak because diff_timestamp differs between otherwise equal
+    responses.
+    """
+    digest = hashlib.sha1(
+        f"{mode.value}:{left_tip_id}:{right_tip_id}:{thread_state}".encode()
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weakly compare an ETag against an If-None-Match list (RFC 9110)."""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
 @router.get(
     "/diff",
     response_model=DiffResponse,
@@ -35,6 +84,7 @@ router = APIRouter(tags=["diff"])
     """,
     responses={
         200: {"description": "Diff computed successfully"},
+        304: {"description": "Neither branch has changed since the diff matching If-None-Match"},
         400: {"description": "Invalid request data"},
         404: {"description": "Branch not found"},
         401: {"description": "Authentication required"},
@@ -45,6 +95,7 @@ def diff(
     left: str = Query(..., description="Left branch ID"),
     right: str = Query(..., description="Right branch ID"),
     mode: DiffMode = Query(DiffMode.MESSAGES, description="Diff mode: summary, messages, or memory"),
+    if_none_match: Optional[str] = Header(None, description="ETag of a previously fetched diff"),
     db: Session = Depends(get_db)
 ):
     """
@@ -54,6 +105,7 @@ def diff(
         left: Left branch identifier
         right: Right branch identifier
         mode: Diff mode (summary, messages, memory)
+        if_none_match: ETag of a cached diff; answered with 304 if still current
         db: Database session
         
     Returns:
@@ -93,6 +145,11 @@ def diff(
             detail="Both branches must have at least one message"
         )
     
+    # Unchanged branches give an unchanged diff; skip recomputing it
+    etag = _diff_etag(mode, left_tip.id, right_tip.id, _thread_state(db, mode, left_branch.thread_id))
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
     # Calculate LCA for message-based diff
     lca_id = find_lca(db, left_tip.id, right_tip.id)
     left_path = path_after(db, lca_id, left_tip.id) if lca_id else []
@@ -128,7 +185,10 @@ def diff(
         message_ranges = compute_message_ranges(db, left, right, lca_id)
         response.message_ranges = message_ranges
     
-    return response
+    # Serialize once in pydantic-core; returning the model would make FastAPI
+    # re-validate and re-encode the whole diff against response_model
+    return Response(content=response.model_dump_json(), media_type="application/json",
+                    headers={"ETag": etag})
 
 
 @router.get(
@@ -145,6 +205,7 @@ def diff(
 def memory_diff(
     left: str = Query(..., description="Left branch ID"),
     right: str = Query(..., description="Right branch ID"),
+    if_none_match: Optional[str] = Header(None, description="ETag of a previously fetched diff"),
     db: Session = Depends(get_db)
 ):
     """
@@ -153,12 +214,13 @@ def memory_diff(
     Args:
         left: Left branch identifier
         right: Right branch identifier
+        if_none_match: ETag of a cached diff
         db: Database session
         
     Returns:
         DiffResponse: Memory diff information
     """
-    return diff(left=left, right=right, mode=DiffMode.MEMORY, db=db)
+    return diff(left=left, right=right, mode=DiffMode.MEMORY, if_none_match=if_none_match, db=db)
 
 
 @router.get(
@@ -175,6 +237,7 @@ def memory_diff(
 def summary_diff(
     left: str = Query(..., description="Left branch ID"),
     right: str = Query(..., description="Right branch ID"),
+    if_none_match: Optional[str] = Header(None, description="ETag of a previously fetched diff"),
     db: Session = Depends(get_db)
 ):
     """
@@ -183,12 +246,13 @@ def summary_diff(
     Args:
         left: Left branch identifier
         right: Right branch identifier
+        if_none_match: ETag of a cached diff
         db: Database session
         
     Returns:
         DiffResponse: Summary diff information
     """
-    return diff(left=left, right=right, mode=DiffMode.SUMMARY, db=db)
+    return diff(left=left, right=right, mode=DiffMode.SUMMARY, if_none_match=if_none_match, db=db)
 
 
 @router.get(
@@ -205,6 +269,7 @@ def summary_diff(
 def message_ranges_diff(
     left: str = Query(..., description="Left branch ID"),
     right: str = Query(..., description="Right branch ID"),
+    if_none_match: Optional[str] = Header(None, description="ETag of a previously fetched diff"),
     db: Session = Depends(get_db)
 ):
     """
@@ -213,9 +278,10 @@ def message_ranges_diff(
     Args:
         left: Left branch identifier
         right: Right branch identifier
+        if_none_match: ETag of a cached diff
         db: Database session
         
     Returns:
         DiffResponse: Message ranges diff information
     """
-    return diff(left=left, right=right, mode=DiffMode.MESSAGES, db=db)
+    return diff(left=left, right=right, mode=DiffMode.MESSAGES, if_none_match=if_none_match, db=db)
@@ -55,7 +55,8 @@ def add_edge(
         )
     
     # Verify source message exists
-    source_message = db.get(Message, body.from_message_id)
+    from_message_id = str(body.from_message_id)
+    source_message = db.get(Message, from_message_id)
     if not source_message:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -72,7 +73,7 @@ def add_edge(
     try:
         edge = EdgeManager.add_edge(
             db=db,
-            from_message_id=body.from_message_id,
+            from_message_id=from_message_id,
             to_message_id=message_id,
             edge_type=body.edge_type,
             weight=body.weight
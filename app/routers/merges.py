@@ -1,18 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
+from typing import Optional
 from uuid import uuid4
 from app.db import get_db
 from app.models import Branch, Message, Merge, Summary, Memory
-from app.schemas import MergeRequest, MergeResponse
+from app.schemas import MergeRequest, MergeResponse, MergeBatchRequest, MergeBatchResponse
 from app.idempotency import IdempotencyKey, validate_idempotency_key
 from app.rate_limiting import rate_limit_middleware
-from app.usage_tracker import UsageTracker, RateLimitHeaders
+from app.usage_tracker import RateLimitHeaders
 from datetime import datetime
 
 from app.auth import get_current_user, get_current_tenant_context, TenantContext
 router = APIRouter(tags=["merges"])
+logger = logging.getLogger(__name__)
 
-from app.merge_utils import find_lca, path_after, interleave_by_created_at
+from app.merge_utils import build_ancestor_set, find_lca, path_after, interleave_by_created_at
 
 
 @router.get(
@@ -60,6 +64,117 @@ def list_merge_strategies():
     }
 from app.merge_strategies import MergeStrategyFactory, MergeContext
 
+def _merge_into(db: Session, src: Branch, src_tip: Message, tgt: Branch, tgt_tip: Message,
+                strategy: str, tgt_ancestors: Optional[set[str]] = None) -> Merge:
+    """
+    Merge a source branch into a target branch on top of the target's tip.
+    
+    Writes the merge commit message, the merged summary and memories, and
+    the Merge record. Runs inside the caller's transaction.
+    
+    Args:
+        db: Database session
+        src: Source branch
+        src_tip: Latest message of the source branch
+        tgt: Target branch
+        tgt_tip: Latest message of the target branch
+        strategy: Merge strategy name
+        tgt_ancestors: Message IDs on the target's tip ancestry, if known
+        
+    Returns:
+        Merge: The new merge record; merged_into_message_id is the merge commit
+    """
+    lca_id = find_lca(db, src_tip.id, tgt_tip.id, b_ancestors=tgt_ancestors)
+    a_path = path_after(db, lca_id, src_tip.id) if lca_id else []
+    b_path = path_after(db, lca_id, tgt_tip.id) if lca_id else []
+
+    merged_stream = interleave_by_created_at(a_path, b_path)
+    diff_summary = {
+        "lca": lca_id,
+        "src_delta": [m.id for m in a_path],
+        "tgt_delta": [m.id for m in b_path],
+        "merged_order": [m.id for m in merged_stream],
+    }
+
+    merge_commit_id = str(uuid4())
+    merge_msg = Message(
+        id=merge_commit_id,
+        tenant_id=tgt.tenant_id,
+        branch_id=tgt.id,
+        parent_message_id=tgt_tip.id,
+        role="assistant",
+        content={"text": f"[merge:{strategy}] merged {src.id} -> {tgt.id}", "diff": diff_summary},
+        state_snapshot={"v": 1, "note": "merged-stub"},
+        origin="merge",
+        created_at=datetime.utcnow(),
+    )
+    db.add(merge_msg)
+    db.flush() # Ensure merge_msg is persisted before Merge references it
+    
+    # Apply merge strategy for summaries and memories
+    try:
+        merge_strategy = MergeStrategyFactory.create_strategy(strategy, db)
+        merge_context = MergeContext(
+            thread_id=tgt.thread_id,
+            source_branch_id=src.id,
+            target_branch_id=tgt.id,
+            merge_id=str(uuid4()),
+            db=db
+        )
+        
+        merge_result = merge_strategy.merge_summaries_and_memories(merge_context)
+        
+        # Save merged summary if created
+        if merge_result.summary:
+            merged_summary = Summary(
+                thread_id=tgt.thread_id,
+                summary_type="thread",
+                content=merge_result.summary.content,
+                summary_metadata=merge_result.summary.metadata,
+                is_current=True,
+                created_at=datetime.utcnow(),
+                updated_at=datetime.utcnow()
+            )
+            db.add(merged_summary)
+        
+        # Save merged memories
+        for memory in merge_result.memories:
+            merged_memory = Memory(
+                thread_id=tgt.thread_id,
+                memory_type=memory.memory_type,
+                key=memory.key,
+                value=memory.value,
+                memory_metadata=memory.metadata,
+                confidence=memory.confidence,
+                source=memory.source,
+                created_at=datetime.utcnow(),
+                updated_at=datetime.utcnow()
+            )
+            db.add(merged_memory)
+        
+        # Update merge metadata with strategy results
+        diff_summary["merge_strategy_results"] = merge_result.metadata
+        
+    except Exception as strategy_error:
+        # Log strategy error but don't fail the merge
+        logger.warning("Merge strategy %r failed for %s -> %s: %s", strategy, src.id, tgt.id, strategy_error)
+        diff_summary["merge_strategy_error"] = str(strategy_error)
+    
+    m = Merge(
+        id=str(uuid4()),
+        thread_id=tgt.thread_id,
+        source_branch_id=src.id,
+        target_branch_id=tgt.id,
+        strategy=strategy,
+        lca_message_id=lca_id,
+        merged_into_message_id=merge_commit_id,
+        summary=diff_summary,
+        created_at=datetime.utcnow(),
+    )
+    db.add(m)
+    return m
+
+
 @router.post(
     "/merge",
     response_model=MergeResponse,
@@ -77,6 +192,8 @@ from app.merge_strategies import MergeStrategyFactory, MergeContext
 )
 def merge(
     req: MergeRequest, 
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     context: TenantContext = Depends(get_current_tenant_context)
 ):
@@ -85,6 +202,8 @@ def merge(
     
     Args:
         req: Merge request data including idempotency key
+        request: Incoming request (carries the counted quota usage)
+        response: Response the rate limit headers are set on
         db: Database session
         
     Returns:
@@ -93,24 +212,21 @@ def merge(
     Raises:
         HTTPException: If merge operation fails
     """
-    # Check rate limits and quotas
-    current_usage = UsageTracker.get_usage(db, context.tenant_id, "merges_per_day", context.user_id)
-    rate_limit_middleware.check_rate_limit_and_quota(
-        db, context, "merge", "merges_per_day", current_usage
-    )
+    # Check rate limits; the quota is counted with the merge below
+    rate_limit_middleware.check_rate_limit_and_quota(db, context, "merge")
 
     # Validate idempotency key
     validate_idempotency_key(req.idempotency_key)
     
     # Check for existing merge with same idempotency key
-    idempotency = IdempotencyKey(db, req.idempotency_key, "merge")
+    idempotency = IdempotencyKey(db, req.idempotency_key, "merge", context.tenant_id)
     cached_result = idempotency.check_and_lock()
     if cached_result:
         return MergeResponse(**cached_result)
 
-    src = db.get(Branch, req.source_branch_id)
-    tgt = db.get(Branch, req.target_branch_id)
-    if not src or not tgt or src.thread_id != tgt.thread_id or tgt.thread_id != req.thread_id:
+    src = db.get(Branch, str(req.source_branch_id))
+    tgt = db.get(Branch, str(req.target_branch_id))
+    if not src or not tgt or src.thread_id != tgt.thread_id or tgt.thread_id != str(req.thread_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail="Branches must exist and belong to the same thread"
@@ -129,32 +245,10 @@ def merge(
             detail="Both branches must have at least one message"
         )
 
-    lca_id = find_lca(db, src_tip.id, tgt_tip.id)
-    a_path = path_after(db, lca_id, src_tip.id) if lca_id else []
-    b_path = path_after(db, lca_id, tgt_tip.id) if lca_id else []
-
-    merged_stream = interleave_by_created_at(a_path, b_path)
-    diff_summary = {
-        "lca": lca_id,
-        "src_delta": [m.id for m in a_path],
-        "tgt_delta": [m.id for m in b_path],
-        "merged_order": [m.id for m in merged_stream],
-    }
-
-    parent_id = tgt_tip.id
-    merge_commit_id = str(uuid4())
-    merge_msg = Message(
-        id=merge_commit_id,
-        branch_id=tgt.id,
-        parent_message_id=parent_id,
-        role="assistant",
-        content={"text": f"[merge:{req.strategy}] merged {src.id} -> {tgt.id}", "diff": diff_summary},
-        state_snapshot={"v": 1, "note": "merged-stub"},
-        origin="merge",
-        created_at=datetime.utcnow(),
-    )
-    
     try:
+        # Count the merge against the quota in the same transaction as the merge
+        rate_limit_middleware.consume_quota(db, context, "merges_per_day", 1, request=request)
+
         # Use explicit commit/rollback if no outer transaction, else nest
         if not db.in_transaction():
             transaction_context = db.begin()
@@ -162,88 +256,33 @@ def merge(
             transaction_context = db.begin_nested()
 
         with transaction_context:
-            db.add(merge_msg)
-            db.flush() # Ensure merge_msg is persisted before Merge references it
-            
-            # Apply merge strategy for summaries and memories
-            try:
-                merge_strategy = MergeStrategyFactory.create_strategy(req.strategy, db)
-                merge_context = MergeContext(
-                    thread_id=tgt.thread_id,
-                    source_branch_id=src.id,
-                    target_branch_id=tgt.id,
-                    merge_id=str(uuid4()),
-                    db=db
-                )
-                
-                merge_result = merge_strategy.merge_summaries_and_memories(merge_context)
-                
-                # Save merged summary if created
-                if merge_result.summary:
-                    merged_summary = Summary(
-                        thread_id=tgt.thread_id,
-                        summary_type="thread",
-                        content=merge_result.summary.content,
-                        summary_metadata=merge_result.summary.metadata,
-                        is_current=True,
-                        created_at=datetime.utcnow(),
-                        updated_at=datetime.utcnow()
-                    )
-                    db.add(merged_summary)
-                
-                # Save merged memories
-                for memory in merge_result.memories:
-                    merged_memory = Memory(
-                        thread_id=tgt.thread_id,
-                        memory_type=memory.memory_type,
-                        key=memory.key,
-                        value=memory.value,
-                        memory_metadata=memory.metadata,
-                        confidence=memory.confidence,
-                        source=memory.source,
-                        created_at=datetime.utcnow(),
-                        updated_at=datetime.utcnow()
-                    )
-                    db.add(merged_memory)
-                
-                # Update merge metadata with strategy results
-                diff_summary["merge_strategy_results"] = merge_result.metadata
-                
-            except Exception as strategy_error:
-                # Log strategy error but don't fail the merge
-                print(f"Merge strategy failed: {strategy_error}")
-                diff_summary["merge_strategy_error"] = str(strategy_error)
-            
-            m = Merge(
-                id=str(uuid4()),
-                thread_id=tgt.thread_id,
-                source_branch_id=src.id,
-                target_branch_id=tgt.id,
-                strategy=req.strategy,
-                lca_message_id=lca_id,
-                merged_into_message_id=merge_commit_id,
-                summary=diff_summary,
-                created_at=datetime.utcnow(),
-            )
-            db.add(m)
+            m = _merge_into(db, src, src_tip, tgt, tgt_tip, req.strategy)
 
         # Only commit if this is the outermost transaction
         if not db.in_nested_transaction():
             db.commit()
 
-        # Track usage
-        UsageTracker.increment_usage(db, context.tenant_id, "merges_per_day", context.user_id, 1)
-
         result = MergeResponse(
             merge_id=m.id, 
-            merged_into_message_id=merge_commit_id
+            merged_into_message_id=m.merged_into_message_id
         )
 
         # Store result for idempotency
-        idempotency.store_result(result.dict())
+        idempotency.store_result(result.model_dump())
+
+        # Quota state comes from the count above; no extra queries
+        response.headers.update(RateLimitHeaders.get_rate_limit_headers(
+            db, context.tenant_id, context.user_id, "merge", request=request
+        ))
 
         return result
         
+    except HTTPException:
+        # Quota exceeded: nothing was written, so the key may be retried
+        if not db.in_nested_transaction():
+            db.rollback()
+        idempotency.release()
+        raise
     except Exception as e:
         # Only rollback if this is the outermost transaction
         if not db.in_nested_transaction():
@@ -252,3 +291,131 @@ def merge(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to merge branches: {str(e)}"
         )
+
+
+@router.post(
+    "/merge:batch",
+    response_model=MergeBatchResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Merge several branches into one target",
+    description="Merge source branches into a target branch one after another, in one request. Supports idempotency keys to prevent duplicate merges.",
+    responses={
+        201: {"description": "Merges completed successfully"},
+        400: {"description": "Invalid request data"},
+        409: {"description": "Idempotency key conflict"},
+        401: {"description": "Authentication required"},
+        422: {"description": "Validation error"},
+    }
+)
+def merge_batch(
+    req: MergeBatchRequest,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    context: TenantContext = Depends(get_current_tenant_context)
+):
+    """
+    Merge several source branches into one target branch, in order.
+    
+    Each merge lands on top of the previous one's merge commit. The target's
+    ancestry is walked once and extended with each merge commit, so every
+    source's LCA lookup only walks that source. Either every merge is
+    written or none is.
+    
+    Args:
+        req: Target branch, source branches with strategies, idempotency key
+        request: Incoming request (carries the counted quota usage)
+        response: Response the rate limit headers are set on
+        db: Database session
+        context: Tenant context
+        
+    Returns:
+        MergeBatchResponse: One merge result per source branch, in order
+        
+    Raises:
+        HTTPException: If a merge operation fails
+    """
+    rate_limit_middleware.check_rate_limit_and_quota(db, context, "merge")
+
+    validate_idempotency_key(req.idempotency_key)
+    idempotency = IdempotencyKey(db, req.idempotency_key, "merge_batch", context.tenant_id)
+    cached_result = idempotency.check_and_lock()
+    if cached_result:
+        return MergeBatchResponse(**cached_result)
+
+    tgt = db.get(Branch, str(req.target_branch_id))
+    sources = [db.get(Branch, str(item.source_branch_id)) for item in req.merges]
+    if not tgt or tgt.thread_id != str(req.thread_id) or any(
+        not src or src.thread_id != tgt.thread_id for src in sources
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Branches must exist and belong to the same thread"
+        )
+
+    tgt_tip = db.query(Message).filter(
+        Message.branch_id == tgt.id
+    ).order_by(Message.created_at.desc()).first()
+    src_tips = [
+        db.query(Message).filter(
+            Message.branch_id == src.id
+        ).order_by(Message.created_at.desc()).first()
+        for src in sources
+    ]
+
+    if not tgt_tip or not all(src_tips):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="All branches must have at least one message"
+        )
+
+    try:
+        # Every merge counts; the whole batch must fit the quota
+        rate_limit_middleware.consume_quota(
+            db, context, "merges_per_day", len(req.merges), request=request
+        )
+
+        if not db.in_transaction():
+            transaction_context = db.begin()
+        else:
+            transaction_context = db.begin_nested()
+
+        with transaction_context:
+            tgt_ancestors = build_ancestor_set(db, tgt_tip.id)
+            results = []
+            for item, src, src_tip in zip(req.merges, sources, src_tips):
+                m = _merge_into(db, src, src_tip, tgt, tgt_tip, item.strategy, tgt_ancestors)
+                results.append(MergeResponse(
+                    merge_id=m.id,
+                    merged_into_message_id=m.merged_into_message_id
+                ))
+                # The merge commit is the target's new tip
+                tgt_tip = db.get(Message, m.merged_into_message_id)
+                tgt_ancestors.add(tgt_tip.id)
+
+        if not db.in_nested_transaction():
+            db.commit()
+
+        result = MergeBatchResponse(results=results)
+
+        idempotency.store_result(result.model_dump())
+
+        # Quota state comes from the count above; no extra queries
+        response.headers.update(RateLimitHeaders.get_rate_limit_headers(
+            db, context.tenant_id, context.user_id, "merge", request=request
+        ))
+
+        return result
+
+    except HTTPException:
+        if not db.in_nested_transaction():
+            db.rollback()
+        idempotency.release()
+        raise
+    except Exception as e:
+        if not db.in_nested_transaction():
+            db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to merge branches: {str(e)}"
+        )
@@ -1,18 +1,25 @@
-from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import List, Dict, Any, Optional, Iterator
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import tuple_
 from uuid import uuid4
 
 from app.db import get_db
 from app.models import Branch, Message
-from app.schemas import MessageIn, MessageOut, MessageResponse, PaginatedMessages, PaginationParams
+from app.schemas import (
+    MessageIn, MessageResponse, PaginatedMessages, PaginationParams,
+    MessageBatchIn, MessageBatchResponse, BatchMessageResult,
+    _Cursor, encode_cursor, decode_cursor
+)
 from app.auth import get_current_user, get_current_tenant_context, TenantContext
+from app.rls_utils import RLSManager
 from app.llm import assistant_reply
 from app.context_builder import ContextBuilder, ContextPolicy
 from app.idempotency import IdempotencyKey, validate_idempotency_key
 from app.rate_limiting import rate_limit_middleware
-from app.usage_tracker import UsageTracker, RateLimitHeaders
+from app.usage_tracker import RateLimitHeaders
 from app.summary_memory import SummaryMemoryManager
 
 from datetime import datetime
@@ -32,7 +39,7 @@ router = APIRouter(tags=["messages"])
 )
 def list_messages(
     branch_id: str,
-    cursor: Optional[str] = Query(None, description="Cursor for pagination (message ID)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor for pagination (next_cursor from a previous page)"),
     limit: int = Query(50, ge=1, le=100, description="Maximum number of messages to return"),
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
@@ -42,7 +49,8 @@ def list_messages(
     
     Args:
         branch_id: Branch identifier
-        cursor: Pagination cursor (message ID)
+        cursor: Opaque pagination cursor; encodes the (created_at, id) of the
+            previous page's last message, which the next page seeks past
         limit: Maximum number of messages to return
         db: Database session
         user: Authenticated user
@@ -51,7 +59,7 @@ def list_messages(
         PaginatedMessages: Paginated list of messages
         
     Raises:
-        HTTPException: If branch not found
+        HTTPException: If branch not found or cursor is malformed
     """
     branch = db.get(Branch, branch_id)
     if not branch:
@@ -64,14 +72,23 @@ def list_messages(
     query = db.query(Message).filter(Message.branch_id == branch_id)
     
     if cursor:
-        # Get the cursor message to find its position
-        cursor_msg = db.get(Message, cursor)
-        if cursor_msg and cursor_msg.branch_id == branch_id:
-            # Get messages created after the cursor message
-            query = query.filter(Message.created_at > cursor_msg.created_at)
+        try:
+            position = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        # Keyset seek past the last message of the previous page
+        query = query.filter(
+            tuple_(Message.created_at, Message.id) > (position.ts, str(position.id))
+        )
     
-    # Order by creation time and limit
-    messages = query.order_by(Message.created_at.asc()).limit(limit + 1).all()
+    # Order by creation time (id breaks ties) and limit
+    messages = (query
+                .order_by(Message.created_at.asc(), Message.id.asc())
+                .limit(limit + 1)
+                .all())
     
     # Check if there are more messages
     has_more = len(messages) > limit
@@ -81,22 +98,205 @@ def list_messages(
     # Determine next cursor
     next_cursor = None
     if has_more and messages:
-        next_cursor = messages[-1].id
+        last = messages[-1]
+        next_cursor = encode_cursor(_Cursor(ts=last.created_at, id=last.id))
     
-    return PaginatedMessages(
-        messages=[
-            MessageOut(
-                id=m.id,
-                role=m.role,
-                content=m.content,
-                parent_message_id=m.parent_message_id,
-                created_at=m.created_at
-            )
-            for m in messages
-        ],
+    page = PaginatedMessages(
+        messages=PaginatedMessages.validate_messages(messages),
         next_cursor=next_cursor,
         has_more=has_more
     )
+    # Encode the page once instead of letting FastAPI re-validate it
+    return Response(content=page.model_dump_json(), media_type="application/json")
+
+
+# Rows fetched per keyset query while streaming a branch
+STREAM_CHUNK_SIZE = 500
+
+
+def _stream_message_lines(bind, tenant_id: str, user_id: str, branch_id: str) -> Iterator[str]:
+    """
+    Yield a branch's messages as NDJSON, one keyset-paged chunk at a time.
+    
+    Only one chunk of rows is held at once. The body is sent after the
+    request's session has been closed, so the stream reads through a session
+    of its own on the same bind, with the caller's tenant context applied,
+    and closes it once the stream ends.
+    """
+    db = Session(bind=bind)
+    try:
+        if bind.dialect.name == "postgresql":
+            RLSManager.set_current_tenant_and_user(db, tenant_id, user_id)
+        position = None
+        while True:
+            query = db.query(Message).filter(Message.branch_id == branch_id)
+            if position is not None:
+                query = query.filter(tuple_(Message.created_at, Message.id) > position)
+            rows = (query
+                    .order_by(Message.created_at.asc(), Message.id.asc())
+                    .limit(STREAM_CHUNK_SIZE)
+                    .all())
+            if not rows:
+                return
+            yield "".join(
+                message.model_dump_json() + "\n"
+                for message in PaginatedMessages.validate_messages(rows)
+            )
+            if len(rows) < STREAM_CHUNK_SIZE:
+                return
+            position = (rows[-1].created_at, rows[-1].id)
+    finally:
+        db.close()
+
+
+@router.get(
+    "/branches/{branch_id}/messages:stream",
+    summary="Stream all messages in a branch",
+    description="Stream every message of a branch, oldest first, as newline-delimited JSON (one message object per line).",
+    responses={
+        200: {"description": "Messages streamed", "content": {"application/x-ndjson": {}}},
+        404: {"description": "Branch not found"},
+        401: {"description": "Authentication required"},
+    }
+)
+def stream_messages(
+    branch_id: str,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Stream all messages in a branch as NDJSON.
+    
+    Args:
+        branch_id: Branch identifier
+        db: Database session
+        user: Authenticated user
+        
+    Returns:
+        StreamingResponse: One JSON-encoded message per line
+        
+    Raises:
+        HTTPException: If branch not found
+    """
+    branch = db.get(Branch, branch_id)
+    if not branch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Branch not found"
+        )
+    return StreamingResponse(
+        _stream_message_lines(db.get_bind(), user.tenant_id, user.id, branch_id),
+        media_type="application/x-ndjson",
+    )
+
+def _send_turn(db: Session, context: TenantContext, branch: Branch, text: str) -> MessageResponse:
+    """
+    Append one user message to a branch and generate the assistant reply.
+    
+    Runs inside the caller's transaction.
+    
+    Args:
+        db: Database session
+        context: Tenant context
+        branch: Target branch
+        text: User message text
+        
+    Returns:
+        MessageResponse: IDs of created user and assistant messages
+    """
+    branch_id = branch.id
+    q = (db.query(Message)
+           .filter(Message.branch_id == branch_id)
+           .order_by(Message.created_at.desc()))
+    if getattr(getattr(db.bind, "dialect", None), "name", "") in ("postgresql", "postgres"):
+        q = q.with_for_update()
+    last_msg = q.first()
+    parent_id_for_user = last_msg.id if last_msg else None
+
+    user_msg = Message(
+        id=str(uuid4()),
+        tenant_id=context.tenant_id,
+        branch_id=branch_id,
+        parent_message_id=parent_id_for_user,
+        role="user",
+        content={"text": text},
+        created_at=datetime.utcnow(),
+    )
+    db.add(user_msg)
+    db.flush() # Ensure user_msg is persisted before assistant_msg references it
+
+    # Build context using single source of truth
+    conversation_context = ContextBuilder(db).build_context(
+        branch_id,
+        ContextPolicy(window_size=50, use_summary=True, use_memory=True, max_tokens=8000)
+    )
+    # Convert context to LLM history format
+    history = []
+    if conversation_context.system:
+        history.append({"role": "system", "content": conversation_context.system})
+    for m in conversation_context.messages_window:
+        content = m.get("content")
+        if isinstance(content, dict):
+            content = content.get("text", "")
+        history.append({"role": m.get("role", "user"), "content": content})
+    # Append the current user message last
+    history.append({"role": "user", "content": text})
+
+    ai_text = assistant_reply(history)
+
+    ai_msg = Message(
+        id=str(uuid4()),
+        tenant_id=context.tenant_id,
+        branch_id=branch_id,
+        parent_message_id=user_msg.id,
+        role="assistant",
+        content={"text": ai_text},
+        state_snapshot={"v": 1, "note": "stub"},
+        created_at=datetime.utcnow(),
+    )
+    db.add(ai_msg)
+    db.flush()  # Ensure ai_msg is persisted before summary/memory update
+
+    # Update rolling summary and extract structured memory
+    summary_manager = SummaryMemoryManager(db)
+    updated_summary, memory_count = summary_manager.update_after_assistant_message(
+        thread_id=branch.thread_id,
+        branch_id=branch_id,
+        assistant_message=ai_msg,
+        target_summary_tokens=200
+    )
+
+    return MessageResponse(
+        user_message_id=user_msg.id,
+        assistant_message_id=ai_msg.id
+    )
+
+
+def _atomic_chat_turns(db: Session, context: TenantContext, branch: Branch, texts: List[str]) -> List[MessageResponse]:
+    """
+    Run chat turns one after another so that they are written completely or not at all.
+    
+    Uses its own transaction, or a savepoint when the caller already has one
+    open; if any turn raises, no user or assistant message from any of them
+    is kept.
+    
+    Args:
+        db: Database session
+        context: Tenant context
+        branch: Target branch
+        texts: User message texts, in order
+        
+    Returns:
+        List[MessageResponse]: IDs of created user and assistant messages per turn
+    """
+    # Use explicit commit/rollback if no outer transaction, else nest
+    if not db.in_transaction():
+        transaction_context = db.begin()
+    else:
+        transaction_context = db.begin_nested()
+
+    with transaction_context:
+        return [_send_turn(db, context, branch, text) for text in texts]
 
 
 @router.post(
@@ -117,6 +317,8 @@ def list_messages(
 def send_user_message(
     branch_id: str, 
     body: MessageIn, 
+    request: Request,
+    response: Response,
     idempotency_key: Optional[str] = Query(None, description="Idempotency key to prevent duplicate operations"),
     db: Session = Depends(get_db), 
     context: TenantContext = Depends(get_current_tenant_context)
@@ -127,6 +329,8 @@ def send_user_message(
     Args:
         branch_id: Branch identifier
         body: Message data
+        request: Incoming request (carries the counted quota usage)
+        response: Response the rate limit headers are set on
         idempotency_key: Optional idempotency key to prevent duplicates
         db: Database session
         context: Tenant context
@@ -144,107 +348,48 @@ def send_user_message(
             detail="Branch not found"
         )
 
-    # Check rate limits and quotas
-    current_usage = UsageTracker.get_usage(db, context.tenant_id, "messages_per_day", context.user_id)
-    rate_limit_middleware.check_rate_limit_and_quota(
-        db, context, "send_message", "messages_per_day", current_usage
-    )
+    # Check rate limits; the quota is counted with the write below
+    rate_limit_middleware.check_rate_limit_and_quota(db, context, "send_message")
 
     # Handle idempotency if key provided
     if idempotency_key:
         validate_idempotency_key(idempotency_key)
-        idempotency = IdempotencyKey(db, idempotency_key, "send_message")
+        idempotency = IdempotencyKey(db, idempotency_key, "send_message", context.tenant_id)
         cached_result = idempotency.check_and_lock()
         if cached_result:
             return MessageResponse(**cached_result)
 
     try:
-        # Use explicit commit/rollback if no outer transaction, else nest
-        if not db.in_transaction():
-            transaction_context = db.begin()
-        else:
-            transaction_context = db.begin_nested()
-
-        with transaction_context:
-            q = (db.query(Message)
-                   .filter(Message.branch_id == branch_id)
-                   .order_by(Message.created_at.desc()))
-            if getattr(getattr(db.bind, "dialect", None), "name", "") in ("postgresql", "postgres"):
-                q = q.with_for_update()
-            last_msg = q.first()
-            parent_id_for_user = last_msg.id if last_msg else None
-
-            user_msg = Message(
-                id=str(uuid4()),
-                tenant_id=context.tenant_id,
-                branch_id=branch_id,
-                parent_message_id=parent_id_for_user,
-                role="user",
-                content={"text": body.text},
-                created_at=datetime.utcnow(),
-            )
-            db.add(user_msg)
-            db.flush() # Ensure user_msg is persisted before assistant_msg references it
+        # Count usage (2 messages: user + assistant) against the quota in the
+        # same transaction, so a failed turn does not use any of it
+        rate_limit_middleware.consume_quota(
+            db, context, "messages_per_day", 2, request=request
+        )
 
-            # Build context using single source of truth
-            conversation_context = ContextBuilder(db).build_context(
-                branch_id,
-                ContextPolicy(window_size=50, use_summary=True, use_memory=True, max_tokens=8000)
-            )
-            # Convert context to LLM history format
-            history = []
-            if conversation_context.system:
-                history.append({"role": "system", "content": conversation_context.system})
-            for m in conversation_context.messages_window:
-                content = m.get("content")
-                if isinstance(content, dict):
-                    content = content.get("text", "")
-                history.append({"role": m.get("role", "user"), "content": content})
-            # Append the current user message last
-            history.append({"role": "user", "content": body.text})
-
-            ai_text = assistant_reply(history)
-
-            ai_msg = Message(
-                id=str(uuid4()),
-                tenant_id=context.tenant_id,
-                branch_id=branch_id,
-                parent_message_id=user_msg.id,
-                role="assistant",
-                content={"text": ai_text},
-                state_snapshot={"v": 1, "note": "stub"},
-                created_at=datetime.utcnow(),
-            )
-            db.add(ai_msg)
-            db.flush()  # Ensure ai_msg is persisted before summary/memory update
-
-            # Update rolling summary and extract structured memory
-            summary_manager = SummaryMemoryManager(db)
-            updated_summary, new_memories = summary_manager.update_after_assistant_message(
-                thread_id=branch.thread_id,
-                branch_id=branch_id,
-                assistant_message=ai_msg,
-                target_summary_tokens=200
-            )
+        result, = _atomic_chat_turns(db, context, branch, [body.text])
 
         # Only commit if this is the outermost transaction
         if not db.in_nested_transaction():
             db.commit()
 
-        # Track usage (count as 2 messages: user + assistant)
-        UsageTracker.increment_usage(db, context.tenant_id, "messages_per_day", context.user_id, 2)
-
-        result = MessageResponse(
-            user_message_id=user_msg.id, 
-            assistant_message_id=ai_msg.id
-        )
-
         # Store result for idempotency
         if idempotency_key:
-            idempotency.store_result(result.dict())
+            idempotency.store_result(result.model_dump())
+
+        # Quota state comes from the count above; no extra queries
+        response.headers.update(RateLimitHeaders.get_rate_limit_headers(
+            db, context.tenant_id, context.user_id, "send_message", request=request
+        ))
 
         return result
 
+    except HTTPException:
+        # Quota exceeded: nothing was written, so the key may be retried
+        if not db.in_nested_transaction():
+            db.rollback()
+        if idempotency_key:
+            idempotency.release()
+        raise
     except Exception as e:
         # Only rollback if this is the outermost transaction
         if not db.in_nested_transaction():
@@ -252,4 +397,108 @@ def send_user_message(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to write message: {type(e).__name__}: {e}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post(
+    "/branches/{branch_id}/messages:batch",
+    response_model=MessageBatchResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Send several messages to a branch",
+    description="Send user messages to a branch in order, getting an AI response to each, in one request. Supports idempotency keys.",
+    responses={
+        201: {"description": "Messages sent successfully"},
+        400: {"description": "Invalid request data"},
+        404: {"description": "Branch not found"},
+        409: {"description": "Idempotency key conflict"},
+        401: {"description": "Authentication required"},
+        422: {"description": "Validation error"},
+    }
+)
+def send_user_messages_batch(
+    branch_id: str,
+    body: MessageBatchIn,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Query(None, description="Idempotency key to prevent duplicate operations"),
+    db: Session = Depends(get_db),
+    context: TenantContext = Depends(get_current_tenant_context)
+):
+    """
+    Send several user messages to a branch, one turn after another.
+    
+    Each message sees the replies to the ones before it. Authentication, the
+    rate limit check and the commit happen once for the whole batch, and
+    either every turn is written or none is.
+    
+    Args:
+        branch_id: Branch identifier
+        body: Messages to send, in order
+        request: Incoming request (carries the counted quota usage)
+        response: Response the rate limit headers are set on
+        idempotency_key: Optional idempotency key to prevent duplicates
+        db: Database session
+        context: Tenant context
+        
+    Returns:
+        MessageBatchResponse: Created message IDs per submitted message, in order
+        
+    Raises:
+        HTTPException: If operation fails
+    """
+    branch = db.get(Branch, branch_id)
+    if not branch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Branch not found"
+        )
+
+    rate_limit_middleware.check_rate_limit_and_quota(db, context, "send_message")
+
+    if idempotency_key:
+        validate_idempotency_key(idempotency_key)
+        idempotency = IdempotencyKey(db, idempotency_key, "send_message_batch", context.tenant_id)
+        cached_result = idempotency.check_and_lock()
+        if cached_result:
+            return MessageBatchResponse(**cached_result)
+
+    try:
+        # Each turn counts as 2 messages; the whole batch must fit the quota
+        rate_limit_middleware.consume_quota(
+            db, context, "messages_per_day", 2 * len(body.messages), request=request
+        )
+
+        turns = _atomic_chat_turns(db, context, branch, [message.text for message in body.messages])
+        results = [
+            BatchMessageResult(custom_id=message.custom_id, **turn.model_dump())
+            for message, turn in zip(body.messages, turns)
+        ]
+
+        if not db.in_nested_transaction():
+            db.commit()
+
+        result = MessageBatchResponse(results=results)
+
+        if idempotency_key:
+            idempotency.store_result(result.model_dump())
+
+        # Quota state comes from the count above; no extra queries
+        response.headers.update(RateLimitHeaders.get_rate_limit_headers(
+            db, context.tenant_id, context.user_id, "send_message", request=request
+        ))
+
+        return result
+
+    except HTTPException:
+        if not db.in_nested_transaction():
+            db.rollback()
+        if idempotency_key:
+            idempotency.release()
+        raise
+    except Exception as e:
+        if not db.in_nested_transaction():
+            db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to write messages: {type(e).__name__}: {e}"
+        )
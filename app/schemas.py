@@ -1,17 +1,296 @@
-from pydantic import BaseModel, Field, validator
-from typing import Optional, List, Literal, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
+from typing import Optional, List, Literal, Dict, Any, Final, Annotated
 from datetime import datetime
+import base64
 import uuid
 from enum import Enum
 
-Role = Literal["user", "assistant", "system", "tool"]
+class Role(str, Enum):
+    """Author of a message"""
+    USER = "user"
+    ASSISTANT = "assistant"
+    SYSTEM = "system"
+    TOOL = "tool"
+
+class MergeStrategy(str, Enum):
+    """Strategies accepted by the merge endpoint"""
+    SYNTACTIC = "syntactic"
+    SEMANTIC = "semantic"
+    HYBRID = "hybrid"
+    APPEND_LAST = "append-last"
+    RESOLVER = "resolver"
+
+# Response timestamps are always datetime objects read from the database, so
+# validate them strictly and skip pydantic's string/number coercion attempts
+Timestamp = Annotated[datetime, Field(strict=True)]
+
+# Request-side string formats, checked by pydantic-core's regex engine. Email is
+# kept loose on purpose: seeded accounts live on .local domains that strict
+# RFC validators reject.
+EmailAddress = Annotated[str, Field(pattern=r"^[^@\s]+@[^@\s]+$", max_length=254)]
+TenantDomain = Annotated[str, Field(pattern=r"^[A-Za-z0-9.-]+$", max_length=253)]
+
+# Field descriptors repeated across models, defined once
+_TENANT_ID_FIELD = Field(..., description="Tenant identifier")
+_USER_ID_FIELD = Field(..., description="User identifier")
+_EMAIL_FIELD = Field(..., description="User email address")
+_FULL_NAME_FIELD = Field(..., description="User full name")
+_TENANT_NAME_FIELD = Field(..., description="Tenant name")
+_TENANT_DOMAIN_FIELD = Field(None, description="Tenant domain")
+_TENANT_SETTINGS_FIELD = Field(None, description="Tenant-specific settings")
+_MESSAGE_ROLE_FIELD = Field(..., description="Message role")
+_MEMORY_KEY_FIELD = Field(..., description="Memory key")
+_MEMORY_TYPE_FIELD = Field(..., description="Memory type")
+_SOURCE_MESSAGE_FIELD = Field(..., description="Source message ID")
+_MERGE_STRATEGY_FIELD = Field(
+    default=MergeStrategy.HYBRID,
+    validate_default=True,
+    description="Merge strategy to use (syntactic/semantic/hybrid for message merging, append-last/resolver for summary/memory merging)"
+)
+_MERGE_IDEMPOTENCY_KEY_FIELD = Field(
+    ...,
+    description="Unique key to ensure idempotent merge operations",
+    examples=["merge_1234567890_abc123"]
+)
+
+# OpenAPI examples, built once and shared by the model configs below
+_THREAD_CREATE_EXAMPLE: Final[dict] = {
+    "title": "My first conversation thread"
+}
+
+_THREAD_OUT_EXAMPLE: Final[dict] = {
+    "id": "550e8400-e29b-41d4-a716-446655440000",
+    "title": "My first conversation thread",
+    "created_at": "2024-01-15T10:30:00Z"
+}
+
+_BRANCH_CREATE_EXAMPLE: Final[dict] = {
+    "name": "feature-branch",
+    "created_from_branch_id": "550e8400-e29b-41d4-a716-446655440001"
+}
+
+_BRANCH_OUT_EXAMPLE: Final[dict] = {
+    "id": "550e8400-e29b-41d4-a716-446655440001",
+    "name": "feature-branch",
+    "thread_id": "550e8400-e29b-41d4-a716-446655440000",
+    "created_from_branch_id": "550e8400-e29b-41d4-a716-446655440003",
+    "created_at": "2024-01-15T10:30:00Z"
+}
+
+_MESSAGE_IN_EXAMPLE: Final[dict] = {
+    "role": "user",
+    "text": "Hello, how are you today?"
+}
+
+_MESSAGE_OUT_EXAMPLE: Final[dict] = {
+    "id": "550e8400-e29b-41d4-a716-446655440002",
+    "role": "user",
+    "content": {"text": "Hello, how are you today?"},
+    "parent_message_id": "550e8400-e29b-41d4-a716-446655440001",
+    "created_at": "2024-01-15T10:30:00Z"
+}
+
+_MESSAGE_RESPONSE_EXAMPLE: Final[dict] = {
+    "user_message_id": "550e8400-e29b-41d4-a716-446655440002",
+    "assistant_message_id": "550e8400-e29b-41d4-a716-446655440003"
+}
+
+_PAGINATED_MESSAGES_EXAMPLE: Final[dict] = {
+    "messages": [
+        {
+            "id": "550e8400-e29b-41d4-a716-446655440002",
+            "role": "user",
+            "content": {"text": "Hello"},
+            "parent_message_id": None,
+            "created_at": "2024-01-15T10:30:00Z"
+        }
+    ],
+    "next_cursor": "eyJ0cyI6IjIwMjQtMDEtMTVUMTA6MzA6MDAiLCJpZCI6IjU1MGU4NDAwLWUyOWItNDFkNC1hNzE2LTQ0NjY1NTQ0MDAwMiJ9",
+    "has_more": True
+}
+
+_MERGE_REQUEST_EXAMPLE: Final[dict] = {
+    "thread_id": "550e8400-e29b-41d4-a716-446655440000",
+    "source_branch_id": "550e8400-e29b-41d4-a716-446655440001",
+    "target_branch_id": "550e8400-e29b-41d4-a716-446655440002",
+    "strategy": "hybrid",
+    "idempotency_key": "merge_1234567890_abc123"
+}
+
+_MERGE_RESPONSE_EXAMPLE: Final[dict] = {
+    "merge_id": "550e8400-e29b-41d4-a716-446655440004",
+    "merged_into_message_id": "550e8400-e29b-41d4-a716-446655440005"
+}
+
+_MEMORY_DIFF_EXAMPLE: Final[dict] = {
+    "added": [
+        {
+            "key": "user_preference_20250821_021401",
+            "value": "Prefers JavaScript for web development",
+            "memory_type": "preference",
+            "confidence": "high"
+        }
+    ],
+    "removed": [],
+    "modified": [],
+    "conflicts": []
+}
+
+_SUMMARY_DIFF_EXAMPLE: Final[dict] = {
+    "left_summary": "Discussion about Python advantages...",
+    "right_summary": "Discussion about JavaScript benefits...",
+    "common_content": "Both branches discuss programming languages",
+    "left_only": "Python advantages: readability, versatility",
+    "right_only": "JavaScript benefits: browser compatibility, React"
+}
+
+_MESSAGE_RANGE_EXAMPLE: Final[dict] = {
+    "start_id": "550e8400-e29b-41d4-a716-446655440001",
+    "end_id": "550e8400-e29b-41d4-a716-446655440005",
+    "count": 5,
+    "messages": [
+        {"id": "550e8400-e29b-41d4-a716-446655440001", "role": "user", "content": "Hello"},
+        {"id": "550e8400-e29b-41d4-a716-446655440002", "role": "assistant", "content": "Hi there!"}
+    ]
+}
+
+_DIFF_RESPONSE_EXAMPLE: Final[dict] = {
+    "lca": "550e8400-e29b-41d4-a716-446655440002",
+    "src_delta": ["550e8400-e29b-41d4-a716-446655440003"],
+    "tgt_delta": ["550e8400-e29b-41d4-a716-446655440004"],
+    "merged_order": [
+        "550e8400-e29b-41d4-a716-446655440002",
+        "550e8400-e29b-41d4-a716-446655440003",
+        "550e8400-e29b-41d4-a716-446655440004"
+    ],
+    "mode": "memory",
+    "memory_diff": {
+        "added": [{"key": "new_memory", "value": "New information"}],
+        "removed": [],
+        "modified": [],
+        "conflicts": []
+    },
+    "left_branch_id": "550e8400-e29b-41d4-a716-446655440001",
+    "right_branch_id": "550e8400-e29b-41d4-a716-446655440002",
+    "diff_timestamp": "2024-01-15T10:30:00Z"
+}
+
+_EDGE_CREATE_EXAMPLE: Final[dict] = {
+    "from_message_id": "550e8400-e29b-41d4-a716-446655440001",
+    "edge_type": "merge_parent",
+    "weight": "0.8"
+}
+
+_EDGE_OUT_EXAMPLE: Final[dict] = {
+    "id": "550e8400-e29b-41d4-a716-446655440006",
+    "from_message_id": "550e8400-e29b-41d4-a716-446655440001",
+    "to_message_id": "550e8400-e29b-41d4-a716-446655440002",
+    "edge_type": "merge_parent",
+    "weight": "0.8",
+    "created_at": "2024-01-15T10:30:00Z"
+}
+
+_LOGIN_REQUEST_EXAMPLE: Final[dict] = {
+    "email": "admin@example.com",
+    "tenant_domain": "example.local",
+    "password": "securepassword123"
+}
+
+_LOGIN_RESPONSE_EXAMPLE: Final[dict] = {
+    "access_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...",
+    "token_type": "bearer",
+    "user": {
+        "id": "550e8400-e29b-41d4-a716-446655440000",
+        "email": "admin@example.com",
+        "name": "Admin User",
+        "role": "admin",
+        "tenant_id": "550e8400-e29b-41d4-a716-446655440001",
+        "permissions": ["*"],
+        "created_at": "2024-01-15T10:30:00Z"
+    }
+}
+
+_TENANT_CREATE_EXAMPLE: Final[dict] = {
+    "name": "Acme Corporation",
+    "domain": "acme.local",
+    "settings": {"theme": "dark", "timezone": "UTC"}
+}
+
+_TENANT_OUT_EXAMPLE: Final[dict] = {
+    "id": "550e8400-e29b-41d4-a716-446655440001",
+    "name": "Acme Corporation",
+    "domain": "acme.local",
+    "settings": {"theme": "dark", "timezone": "UTC"},
+    "is_active": True,
+    "created_at": "2024-01-15T10:30:00Z",
+    "updated_at": "2024-01-15T10:30:00Z"
+}
+
+_USER_CREATE_EXAMPLE: Final[dict] = {
+    "email": "john.doe@example.com",
+    "name": "John Doe",
+    "role": "user",
+    "permissions": ["read", "write"]
+}
+
+_USER_OUT_EXAMPLE: Final[dict] = {
+    "id": "550e8400-e29b-41d4-a716-446655440000",
+    "email": "john.doe@example.com",
+    "name": "John Doe",
+    "role": "user",
+    "tenant_id": "550e8400-e29b-41d4-a716-446655440001",
+    "permissions": ["read", "write"],
+    "created_at": "2024-01-15T10:30:00Z"
+}
+
+_THREAD_COLLABORATOR_CREATE_EXAMPLE: Final[dict] = {
+    "user_id": "550e8400-e29b-41d4-a716-446655440000",
+    "role": "editor",
+    "permissions": ["read", "write", "merge"]
+}
+
+_THREAD_COLLABORATOR_OUT_EXAMPLE: Final[dict] = {
+    "id": "550e8400-e29b-41d4-a716-446655440006",
+    "thread_id": "550e8400-e29b-41d4-a716-446655440002",
+    "user_id": "550e8400-e29b-41d4-a716-446655440000",
+    "tenant_id": "550e8400-e29b-41d4-a716-446655440001",
+    "role": "editor",
+    "permissions": ["read", "write", "merge"],
+    "is_active": True,
+    "created_at": "2024-01-15T10:30:00Z"
+}
+
+_USAGE_SUMMARY_EXAMPLE: Final[dict] = {
+    "tenant_id": "550e8400-e29b-41d4-a716-446655440001",
+    "user_id": "550e8400-e29b-41d4-a716-446655440000",
+    "usage": {
+        "messages_per_day": {
+            "current": 150,
+            "quota": 10000,
+            "remaining": 9850,
+            "percentage": 1.5
+        },
+        "merges_per_day": {
+            "current": 5,
+            "quota": 1000,
+            "remaining": 995,
+            "percentage": 0.5
+        }
+    }
+}
+
+_ERROR_RESPONSE_EXAMPLE: Final[dict] = {
+    "error": "Branch not found",
+    "detail": "The specified branch ID does not exist",
+    "code": "BRANCH_NOT_FOUND"
+}
 
 # Base models with common fields
 class IdempotencyKey(BaseModel):
     idempotency_key: str = Field(
         ..., 
         description="Unique key to ensure idempotent operations",
-        example="msg_1234567890_abc123"
+        examples=["msg_1234567890_abc123"]
     )
 
 # Thread schemas
@@ -21,29 +300,21 @@ class ThreadCreate(BaseModel):
         min_length=1, 
         max_length=200,
         description="Title of the thread",
-        example="My first conversation thread"
+        examples=["My first conversation thread"]
     )
 
-    class Config:
-        schema_extra = {
-            "example": {
-                "title": "My first conversation thread"
-            }
-        }
+    model_config = ConfigDict(json_schema_extra={"example": _THREAD_CREATE_EXAMPLE})
 
 class ThreadOut(BaseModel):
     id: str = Field(..., description="Unique thread identifier")
     title: str = Field(..., description="Thread title")
-    created_at: datetime = Field(..., description="Thread creation timestamp")
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "id": "550e8400-e29b-41d4-a716-446655440000",
-                "title": "My first conversation thread",
-                "created_at": "2024-01-15T10:30:00Z"
-            }
-        }
+    created_at: Timestamp = Field(..., description="Thread creation timestamp")
+
+    model_config = ConfigDict(
+        from_attributes=True,
+        frozen=True,
+        json_schema_extra={"example": _THREAD_OUT_EXAMPLE},
+    )
 
 # Branch schemas
 class BranchCreate(BaseModel):
@@ -52,35 +323,20 @@ class BranchCreate(BaseModel):
         min_length=1, 
         max_length=100,
         description="Name of the branch",
-        example="main"
+        examples=["main"]
     )
-    created_from_branch_id: Optional[str] = Field(
+    created_from_branch_id: Optional[uuid.UUID] = Field(
         None, 
         description="ID of the branch to fork from",
-        example="550e8400-e29b-41d4-a716-446655440001"
+        examples=["550e8400-e29b-41d4-a716-446655440001"]
     )
-    created_from_message_id: Optional[str] = Field(
+    created_from_message_id: Optional[uuid.UUID] = Field(
         None, 
         description="ID of the message to fork from",
-        example="550e8400-e29b-41d4-a716-446655440002"
+        examples=["550e8400-e29b-41d4-a716-446655440002"]
     )
 
-    @validator('created_from_branch_id', 'created_from_message_id')
-    def validate_uuid(cls, v):
-        if v is not None:
-            try:
-                uuid.UUID(v)
-            except ValueError:
-                raise ValueError('Must be a valid UUID')
-        return v
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "name": "feature-branch",
-                "created_from_branch_id": "550e8400-e29b-41d4-a716-446655440001"
-            }
-        }
+    model_config = ConfigDict(json_schema_extra={"example": _BRANCH_CREATE_EXAMPLE})
 
 class BranchOut(BaseModel):
     id: str = Field(..., description="Unique branch identifier")
@@ -88,81 +344,108 @@ class BranchOut(BaseModel):
     thread_id: str = Field(..., description="Parent thread ID")
     created_from_branch_id: Optional[str] = Field(None, description="Source branch ID if forked")
     created_from_message_id: Optional[str] = Field(None, description="Source message ID if forked")
-    created_at: datetime = Field(..., description="Branch creation timestamp")
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "id": "550e8400-e29b-41d4-a716-446655440001",
-                "name": "feature-branch",
-                "thread_id": "550e8400-e29b-41d4-a716-446655440000",
-                "created_from_branch_id": "550e8400-e29b-41d4-a716-446655440003",
-                "created_at": "2024-01-15T10:30:00Z"
-            }
-        }
+    created_at: Timestamp = Field(..., description="Branch creation timestamp")
+
+    model_config = ConfigDict(
+        from_attributes=True,
+        frozen=True,
+        json_schema_extra={"example": _BRANCH_OUT_EXAMPLE},
+    )
 
 # Message schemas
 class MessageIn(BaseModel):
-    role: Literal["user"] = Field(..., description="Message role")
+    role: Literal[Role.USER] = _MESSAGE_ROLE_FIELD
     text: str = Field(
         ..., 
         min_length=1, 
         max_length=10000,
         description="Message content",
-        example="Hello, how are you today?"
+        examples=["Hello, how are you today?"]
     )
 
-    class Config:
-        schema_extra = {
-            "example": {
-                "role": "user",
-                "text": "Hello, how are you today?"
-            }
-        }
+    model_config = ConfigDict(
+        use_enum_values=True,
+        json_schema_extra={"example": _MESSAGE_IN_EXAMPLE},
+    )
+
+class MessageContent(BaseModel):
+    """Stored message body; merge commits carry an extra ``diff`` key"""
+    text: str = Field(..., description="Message text")
+    tool_calls: Optional[list] = Field(None, description="Tool calls issued by the assistant")
+
+    model_config = ConfigDict(extra="allow")
 
 class MessageOut(BaseModel):
     id: str = Field(..., description="Unique message identifier")
-    role: Role = Field(..., description="Message role")
-    content: Dict[str, Any] = Field(..., description="Message content")
+    role: Role = _MESSAGE_ROLE_FIELD
+    content: MessageContent = Field(..., description="Message content")
     parent_message_id: Optional[str] = Field(None, description="Parent message ID")
-    created_at: datetime = Field(..., description="Message creation timestamp")
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "id": "550e8400-e29b-41d4-a716-446655440002",
-                "role": "user",
-                "content": {"text": "Hello, how are you today?"},
-                "parent_message_id": "550e8400-e29b-41d4-a716-446655440001",
-                "created_at": "2024-01-15T10:30:00Z"
-            }
-        }
+    created_at: Timestamp = Field(..., description="Message creation timestamp")
+
+    model_config = ConfigDict(
+        from_attributes=True,
+        frozen=True,
+        json_schema_extra={"example": _MESSAGE_OUT_EXAMPLE},
+    )
 
 class MessageResponse(BaseModel):
     user_message_id: str = Field(..., description="ID of the created user message")
     assistant_message_id: str = Field(..., description="ID of the generated assistant message")
 
-    class Config:
-        schema_extra = {
-            "example": {
-                "user_message_id": "550e8400-e29b-41d4-a716-446655440002",
-                "assistant_message_id": "550e8400-e29b-41d4-a716-446655440003"
-            }
-        }
+    model_config = ConfigDict(json_schema_extra={"example": _MESSAGE_RESPONSE_EXAMPLE})
+
+class BatchMessageIn(MessageIn):
+    custom_id: Optional[str] = Field(
+        None,
+        max_length=100,
+        description="Caller-chosen ID echoed back with this message's result"
+    )
+
+class MessageBatchIn(BaseModel):
+    messages: List[BatchMessageIn] = Field(
+        ...,
+        min_length=1,
+        max_length=20,
+        description="Messages to send, in conversation order"
+    )
+
+class BatchMessageResult(MessageResponse):
+    custom_id: Optional[str] = Field(None, description="custom_id of the submitted message")
+
+class MessageBatchResponse(BaseModel):
+    results: List[BatchMessageResult] = Field(..., description="One result per message, in submission order")
 
 # Pagination schemas
+class _Cursor(BaseModel):
+    """Keyset position of the last message on a page"""
+    ts: datetime
+    id: uuid.UUID
+
+    model_config = ConfigDict(frozen=True)
+
+# Built once so every page reuses the same compiled validator/serializer
+_CURSOR_ADAPTER = TypeAdapter(_Cursor)
+
+def encode_cursor(c: _Cursor) -> str:
+    """Encode a cursor as an opaque URL-safe string."""
+    return base64.urlsafe_b64encode(_CURSOR_ADAPTER.dump_json(c)).decode("ascii")
+
+def decode_cursor(s: str) -> _Cursor:
+    """Decode an opaque cursor string; raises ValueError if it is malformed."""
+    return _CURSOR_ADAPTER.validate_json(base64.urlsafe_b64decode(s))
+
 class PaginationParams(BaseModel):
     cursor: Optional[str] = Field(
         None, 
-        description="Cursor for pagination (message ID)",
-        example="550e8400-e29b-41d4-a716-446655440002"
+        description="Opaque cursor for pagination (next_cursor from a previous page)",
+        examples=["eyJ0cyI6IjIwMjQtMDEtMTVUMTA6MzA6MDAiLCJpZCI6IjU1MGU4NDAwLWUyOWItNDFkNC1hNzE2LTQ0NjY1NTQ0MDAwMiJ9"]
     )
     limit: int = Field(
         default=50, 
         ge=1, 
         le=100,
         description="Maximum number of messages to return",
-        example=50
+        examples=[50]
     )
 
 class PaginatedMessages(BaseModel):
@@ -170,68 +453,59 @@ class PaginatedMessages(BaseModel):
     next_cursor: Optional[str] = Field(None, description="Cursor for next page")
     has_more: bool = Field(..., description="Whether there are more messages")
 
-    class Config:
-        schema_extra = {
-            "example": {
-                "messages": [
-                    {
-                        "id": "550e8400-e29b-41d4-a716-446655440002",
-                        "role": "user",
-                        "content": {"text": "Hello"},
-                        "parent_message_id": None,
-                        "created_at": "2024-01-15T10:30:00Z"
-                    }
-                ],
-                "next_cursor": "550e8400-e29b-41d4-a716-446655440003",
-                "has_more": True
-            }
-        }
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_schema_extra={"example": _PAGINATED_MESSAGES_EXAMPLE},
+    )
+
+    @staticmethod
+    def validate_messages(rows) -> List[MessageOut]:
+        """Validate a page of Message rows in a single adapter call"""
+        return MessageListAdapter.validate_python(rows, from_attributes=True)
+
+# Built once so each page validates its rows through one cached validator
+MessageListAdapter = TypeAdapter(List[MessageOut])
 
 # Merge schemas
 class MergeRequest(BaseModel):
-    thread_id: str = Field(..., description="Thread ID")
-    source_branch_id: str = Field(..., description="Source branch ID")
-    target_branch_id: str = Field(..., description="Target branch ID")
-    strategy: Literal["syntactic", "semantic", "hybrid", "append-last", "resolver"] = Field(
-        default="hybrid", 
-        description="Merge strategy to use (syntactic/semantic/hybrid for message merging, append-last/resolver for summary/memory merging)"
-    )
-    idempotency_key: str = Field(
-        ..., 
-        description="Unique key to ensure idempotent merge operations",
-        example="merge_1234567890_abc123"
+    thread_id: uuid.UUID = Field(..., description="Thread ID")
+    source_branch_id: uuid.UUID = Field(..., description="Source branch ID")
+    target_branch_id: uuid.UUID = Field(..., description="Target branch ID")
+    strategy: MergeStrategy = _MERGE_STRATEGY_FIELD
+    idempotency_key: str = _MERGE_IDEMPOTENCY_KEY_FIELD
+
+    model_config = ConfigDict(
+        use_enum_values=True,
+        json_schema_extra={"example": _MERGE_REQUEST_EXAMPLE},
     )
 
-    @validator('thread_id', 'source_branch_id', 'target_branch_id')
-    def validate_uuid(cls, v):
-        try:
-            uuid.UUID(v)
-        except ValueError:
-            raise ValueError('Must be a valid UUID')
-        return v
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "thread_id": "550e8400-e29b-41d4-a716-446655440000",
-                "source_branch_id": "550e8400-e29b-41d4-a716-446655440001",
-                "target_branch_id": "550e8400-e29b-41d4-a716-446655440002",
-                "strategy": "hybrid",
-                "idempotency_key": "merge_1234567890_abc123"
-            }
-        }
-
 class MergeResponse(BaseModel):
     merge_id: str = Field(..., description="Unique merge identifier")
     merged_into_message_id: str = Field(..., description="ID of the merge commit message")
 
-    class Config:
-        schema_extra = {
-            "example": {
-                "merge_id": "550e8400-e29b-41d4-a716-446655440004",
-                "merged_into_message_id": "550e8400-e29b-41d4-a716-446655440005"
-            }
-        }
+    model_config = ConfigDict(json_schema_extra={"example": _MERGE_RESPONSE_EXAMPLE})
+
+class MergeBatchItem(BaseModel):
+    source_branch_id: uuid.UUID = Field(..., description="Source branch ID")
+    strategy: MergeStrategy = _MERGE_STRATEGY_FIELD
+
+    model_config = ConfigDict(use_enum_values=True)
+
+class MergeBatchRequest(BaseModel):
+    thread_id: uuid.UUID = Field(..., description="Thread ID")
+    target_branch_id: uuid.UUID = Field(..., description="Target branch ID")
+    merges: List[MergeBatchItem] = Field(
+        ...,
+        min_length=1,
+        max_length=10,
+        description="Source branches to merge into the target, in order"
+    )
+    idempotency_key: str = _MERGE_IDEMPOTENCY_KEY_FIELD
+
+    model_config = ConfigDict(use_enum_values=True)
+
+class MergeBatchResponse(BaseModel):
+    results: List[MergeResponse] = Field(..., description="One result per source branch, in submission order")
 
 # Diff schemas
 class DiffMode(str, Enum):
@@ -240,29 +514,38 @@ class DiffMode(str, Enum):
     MESSAGES = "messages" 
     MEMORY = "memory"
 
+class MemoryEntry(BaseModel):
+    """A memory present on only one side of a diff"""
+    key: str = _MEMORY_KEY_FIELD
+    value: str = Field(..., description="Memory value")
+    memory_type: str = _MEMORY_TYPE_FIELD
+    confidence: Optional[str] = Field(None, description="Confidence level (high, medium or low)")
+    source: Optional[str] = Field(None, description="How this memory was derived")
+    created_at: Optional[str] = Field(None, description="Memory creation timestamp")
+    diff_type: Optional[str] = Field(None, description="Which side the memory came from")
+
+class MemoryChange(BaseModel):
+    """A memory whose value differs between the two branches"""
+    key: str = _MEMORY_KEY_FIELD
+    left_value: str = Field(..., description="Value in left branch")
+    right_value: str = Field(..., description="Value in right branch")
+    memory_type: str = _MEMORY_TYPE_FIELD
+    left_confidence: Optional[str] = Field(None, description="Confidence in left branch")
+    right_confidence: Optional[str] = Field(None, description="Confidence in right branch")
+    left_source: Optional[str] = Field(None, description="Source in left branch")
+    right_source: Optional[str] = Field(None, description="Source in right branch")
+    left_updated: str = Field(..., description="Last update in left branch")
+    right_updated: str = Field(..., description="Last update in right branch")
+    is_conflict: bool = Field(..., description="Whether both branches changed it from the base")
+
 class MemoryDiff(BaseModel):
     """Represents differences in memory between branches"""
-    added: List[Dict[str, Any]] = Field(..., description="Memories added in right branch")
-    removed: List[Dict[str, Any]] = Field(..., description="Memories removed in right branch")
-    modified: List[Dict[str, Any]] = Field(..., description="Memories modified between branches")
-    conflicts: List[Dict[str, Any]] = Field(..., description="Conflicting memories that need resolution")
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "added": [
-                    {
-                        "key": "user_preference_20250821_021401",
-                        "value": "Prefers JavaScript for web development",
-                        "memory_type": "preference",
-                        "confidence": "high"
-                    }
-                ],
-                "removed": [],
-                "modified": [],
-                "conflicts": []
-            }
-        }
+    added: List[MemoryEntry] = Field(..., description="Memories added in right branch")
+    removed: List[MemoryEntry] = Field(..., description="Memories removed in right branch")
+    modified: List[MemoryChange] = Field(..., description="Memories modified between branches")
+    conflicts: List[MemoryChange] = Field(..., description="Conflicting memories that need resolution")
+
+    model_config = ConfigDict(json_schema_extra={"example": _MEMORY_DIFF_EXAMPLE})
 
 class SummaryDiff(BaseModel):
     """Represents differences in summaries between branches"""
@@ -272,16 +555,7 @@ class SummaryDiff(BaseModel):
     left_only: str = Field(..., description="Content only in left summary")
     right_only: str = Field(..., description="Content only in right summary")
 
-    class Config:
-        schema_extra = {
-            "example": {
-                "left_summary": "Discussion about Python advantages...",
-                "right_summary": "Discussion about JavaScript benefits...",
-                "common_content": "Both branches discuss programming languages",
-                "left_only": "Python advantages: readability, versatility",
-                "right_only": "JavaScript benefits: browser compatibility, React"
-            }
-        }
+    model_config = ConfigDict(json_schema_extra={"example": _SUMMARY_DIFF_EXAMPLE})
 
 class MessageRange(BaseModel):
     """Represents a range of messages by ID"""
@@ -290,18 +564,7 @@ class MessageRange(BaseModel):
     count: int = Field(..., description="Number of messages in range")
     messages: List[Dict[str, Any]] = Field(..., description="Messages in this range")
 
-    class Config:
-        schema_extra = {
-            "example": {
-                "start_id": "550e8400-e29b-41d4-a716-446655440001",
-                "end_id": "550e8400-e29b-41d4-a716-446655440005",
-                "count": 5,
-                "messages": [
-                    {"id": "550e8400-e29b-41d4-a716-446655440001", "role": "user", "content": "Hello"},
-                    {"id": "550e8400-e29b-41d4-a716-446655440002", "role": "assistant", "content": "Hi there!"}
-                ]
-            }
-        }
+    model_config = ConfigDict(json_schema_extra={"example": _MESSAGE_RANGE_EXAMPLE})
 
 class DiffResponse(BaseModel):
     lca: Optional[str] = Field(None, description="Lowest Common Ancestor message ID")
@@ -318,268 +581,134 @@ class DiffResponse(BaseModel):
     # Metadata
     left_branch_id: str = Field(..., description="Left branch ID")
     right_branch_id: str = Field(..., description="Right branch ID")
-    diff_timestamp: datetime = Field(..., description="When this diff was computed")
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "lca": "550e8400-e29b-41d4-a716-446655440002",
-                "src_delta": ["550e8400-e29b-41d4-a716-446655440003"],
-                "tgt_delta": ["550e8400-e29b-41d4-a716-446655440004"],
-                "merged_order": [
-                    "550e8400-e29b-41d4-a716-446655440002",
-                    "550e8400-e29b-41d4-a716-446655440003",
-                    "550e8400-e29b-41d4-a716-446655440004"
-                ],
-                "mode": "memory",
-                "memory_diff": {
-                    "added": [{"key": "new_memory", "value": "New information"}],
-                    "removed": [],
-                    "modified": [],
-                    "conflicts": []
-                },
-                "left_branch_id": "550e8400-e29b-41d4-a716-446655440001",
-                "right_branch_id": "550e8400-e29b-41d4-a716-446655440002",
-                "diff_timestamp": "2024-01-15T10:30:00Z"
-            }
-        }
+    diff_timestamp: Timestamp = Field(..., description="When this diff was computed")
+
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_schema_extra={"example": _DIFF_RESPONSE_EXAMPLE},
+    )
 
 # Edge schemas
 class EdgeCreate(BaseModel):
-    from_message_id: str = Field(..., description="Source message ID")
+    from_message_id: uuid.UUID = _SOURCE_MESSAGE_FIELD
     edge_type: Literal["parent", "merge_parent", "reference"] = Field(
         default="parent", 
         description="Type of edge relationship"
     )
     weight: Optional[str] = Field(None, description="Optional weight for the edge")
 
-    @validator('from_message_id')
-    def validate_uuid(cls, v):
-        try:
-            uuid.UUID(v)
-        except ValueError:
-            raise ValueError('Must be a valid UUID')
-        return v
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "from_message_id": "550e8400-e29b-41d4-a716-446655440001",
-                "edge_type": "merge_parent",
-                "weight": "0.8"
-            }
-        }
+    model_config = ConfigDict(json_schema_extra={"example": _EDGE_CREATE_EXAMPLE})
 
 class EdgeOut(BaseModel):
     id: str = Field(..., description="Unique edge identifier")
-    from_message_id: str = Field(..., description="Source message ID")
+    from_message_id: str = _SOURCE_MESSAGE_FIELD
     to_message_id: str = Field(..., description="Target message ID")
     edge_type: str = Field(..., description="Type of edge relationship")
     weight: Optional[str] = Field(None, description="Edge weight")
-    created_at: datetime = Field(..., description="Edge creation timestamp")
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "id": "550e8400-e29b-41d4-a716-446655440006",
-                "from_message_id": "550e8400-e29b-41d4-a716-446655440001",
-                "to_message_id": "550e8400-e29b-41d4-a716-446655440002",
-                "edge_type": "merge_parent",
-                "weight": "0.8",
-                "created_at": "2024-01-15T10:30:00Z"
-            }
-        }
+    created_at: Timestamp = Field(..., description="Edge creation timestamp")
+
+    model_config = ConfigDict(
+        from_attributes=True,
+        frozen=True,
+        json_schema_extra={"example": _EDGE_OUT_EXAMPLE},
+    )
 
 # Auth schemas
 class LoginRequest(BaseModel):
-    email: str = Field(..., description="User email address")
-    tenant_domain: str = Field(..., description="Tenant domain")
+    email: EmailAddress = _EMAIL_FIELD
+    tenant_domain: TenantDomain = Field(..., description="Tenant domain")
     password: str = Field(..., description="User password")
 
-    class Config:
-        schema_extra = {
-            "example": {
-                "email": "admin@example.com",
-                "tenant_domain": "example.local",
-                "password": "securepassword123"
-            }
-        }
+    model_config = ConfigDict(json_schema_extra={"example": _LOGIN_REQUEST_EXAMPLE})
+
+class UserOut(BaseModel):
+    id: str = Field(..., description="Unique user identifier")
+    email: str = _EMAIL_FIELD
+    name: str = _FULL_NAME_FIELD
+    role: str = Field(..., description="User role")
+    tenant_id: str = _TENANT_ID_FIELD
+    permissions: List[str] = Field(..., description="User permissions")
+    created_at: Timestamp = Field(..., description="User creation timestamp")
+
+    model_config = ConfigDict(
+        from_attributes=True,
+        frozen=True,
+        json_schema_extra={"example": _USER_OUT_EXAMPLE},
+    )
 
 class LoginResponse(BaseModel):
     access_token: str = Field(..., description="JWT access token")
     token_type: str = Field(..., description="Token type (bearer)")
-    user: "UserOut" = Field(..., description="User information")
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "access_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...",
-                "token_type": "bearer",
-                "user": {
-                    "id": "550e8400-e29b-41d4-a716-446655440000",
-                    "email": "admin@example.com",
-                    "name": "Admin User",
-                    "role": "admin",
-                    "tenant_id": "550e8400-e29b-41d4-a716-446655440001",
-                    "permissions": ["*"],
-                    "created_at": "2024-01-15T10:30:00Z"
-                }
-            }
-        }
+    user: UserOut = Field(..., description="User information")
+
+    model_config = ConfigDict(json_schema_extra={"example": _LOGIN_RESPONSE_EXAMPLE})
 
 class TenantCreate(BaseModel):
-    name: str = Field(..., description="Tenant name")
-    domain: Optional[str] = Field(None, description="Tenant domain")
-    settings: Optional[Dict[str, Any]] = Field(None, description="Tenant-specific settings")
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "name": "Acme Corporation",
-                "domain": "acme.local",
-                "settings": {"theme": "dark", "timezone": "UTC"}
-            }
-        }
+    name: str = _TENANT_NAME_FIELD
+    domain: Optional[str] = _TENANT_DOMAIN_FIELD
+    settings: Optional[Dict[str, Any]] = _TENANT_SETTINGS_FIELD
+
+    model_config = ConfigDict(json_schema_extra={"example": _TENANT_CREATE_EXAMPLE})
 
 class TenantOut(BaseModel):
     id: str = Field(..., description="Unique tenant identifier")
-    name: str = Field(..., description="Tenant name")
-    domain: Optional[str] = Field(None, description="Tenant domain")
-    settings: Optional[Dict[str, Any]] = Field(None, description="Tenant-specific settings")
+    name: str = _TENANT_NAME_FIELD
+    domain: Optional[str] = _TENANT_DOMAIN_FIELD
+    settings: Optional[Dict[str, Any]] = _TENANT_SETTINGS_FIELD
     is_active: bool = Field(..., description="Whether tenant is active")
-    created_at: datetime = Field(..., description="Tenant creation timestamp")
-    updated_at: datetime = Field(..., description="Tenant last update timestamp")
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "id": "550e8400-e29b-41d4-a716-446655440001",
-                "name": "Acme Corporation",
-                "domain": "acme.local",
-                "settings": {"theme": "dark", "timezone": "UTC"},
-                "is_active": True,
-                "created_at": "2024-01-15T10:30:00Z",
-                "updated_at": "2024-01-15T10:30:00Z"
-            }
-        }
+    created_at: Timestamp = Field(..., description="Tenant creation timestamp")
+    updated_at: Timestamp = Field(..., description="Tenant last update timestamp")
+
+    model_config = ConfigDict(
+        from_attributes=True,
+        frozen=True,
+        json_schema_extra={"example": _TENANT_OUT_EXAMPLE},
+    )
 
 class UserCreate(BaseModel):
-    email: str = Field(..., description="User email address")
-    name: str = Field(..., description="User full name")
+    email: EmailAddress = _EMAIL_FIELD
+    name: str = _FULL_NAME_FIELD
     role: Literal["admin", "user", "guest"] = Field(default="user", description="User role")
     permissions: Optional[List[str]] = Field(None, description="User permissions")
 
-    @validator('email')
-    def validate_email(cls, v):
-        if '@' not in v:
-            raise ValueError('Must be a valid email address')
-        return v
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "email": "john.doe@example.com",
-                "name": "John Doe",
-                "role": "user",
-                "permissions": ["read", "write"]
-            }
-        }
-
-class UserOut(BaseModel):
-    id: str = Field(..., description="Unique user identifier")
-    email: str = Field(..., description="User email address")
-    name: str = Field(..., description="User full name")
-    role: str = Field(..., description="User role")
-    tenant_id: str = Field(..., description="Tenant identifier")
-    permissions: List[str] = Field(..., description="User permissions")
-    created_at: datetime = Field(..., description="User creation timestamp")
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "id": "550e8400-e29b-41d4-a716-446655440000",
-                "email": "john.doe@example.com",
-                "name": "John Doe",
-                "role": "user",
-                "tenant_id": "550e8400-e29b-41d4-a716-446655440001",
-                "permissions": ["read", "write"],
-                "created_at": "2024-01-15T10:30:00Z"
-            }
-        }
+    model_config = ConfigDict(json_schema_extra={"example": _USER_CREATE_EXAMPLE})
 
 class ThreadCollaboratorCreate(BaseModel):
-    user_id: str = Field(..., description="User identifier")
+    user_id: uuid.UUID = _USER_ID_FIELD
     role: Literal["owner", "editor", "viewer"] = Field(default="viewer", description="Collaborator role")
     permissions: Optional[List[str]] = Field(None, description="Thread-specific permissions")
 
-    @validator('user_id')
-    def validate_uuid(cls, v):
-        try:
-            uuid.UUID(v)
-        except ValueError:
-            raise ValueError('Must be a valid UUID')
-        return v
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "user_id": "550e8400-e29b-41d4-a716-446655440000",
-                "role": "editor",
-                "permissions": ["read", "write", "merge"]
-            }
-        }
+    model_config = ConfigDict(json_schema_extra={"example": _THREAD_COLLABORATOR_CREATE_EXAMPLE})
 
 class ThreadCollaboratorOut(BaseModel):
     id: str = Field(..., description="Unique collaborator identifier")
     thread_id: str = Field(..., description="Thread identifier")
-    user_id: str = Field(..., description="User identifier")
-    tenant_id: str = Field(..., description="Tenant identifier")
+    user_id: str = _USER_ID_FIELD
+    tenant_id: str = _TENANT_ID_FIELD
     role: str = Field(..., description="Collaborator role")
     permissions: List[str] = Field(..., description="Thread-specific permissions")
     is_active: bool = Field(..., description="Whether collaborator is active")
-    created_at: datetime = Field(..., description="Collaboration creation timestamp")
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "id": "550e8400-e29b-41d4-a716-446655440006",
-                "thread_id": "550e8400-e29b-41d4-a716-446655440002",
-                "user_id": "550e8400-e29b-41d4-a716-446655440000",
-                "tenant_id": "550e8400-e29b-41d4-a716-446655440001",
-                "role": "editor",
-                "permissions": ["read", "write", "merge"],
-                "is_active": True,
-                "created_at": "2024-01-15T10:30:00Z"
-            }
-        }
+    created_at: Timestamp = Field(..., description="Collaboration creation timestamp")
+
+    model_config = ConfigDict(
+        from_attributes=True,
+        frozen=True,
+        json_schema_extra={"example": _THREAD_COLLABORATOR_OUT_EXAMPLE},
+    )
 
 # Usage schemas
+class UsageEntry(BaseModel):
+    current: int = Field(..., description="Usage so far in the current window")
+    quota: int = Field(..., description="Quota for the current window")
+    remaining: int = Field(..., description="Remaining usage before the quota is hit")
+    percentage: float = Field(..., description="Share of the quota used, in percent")
+
 class UsageSummary(BaseModel):
-    tenant_id: str = Field(..., description="Tenant identifier")
+    tenant_id: str = _TENANT_ID_FIELD
     user_id: Optional[str] = Field(None, description="User identifier (if user-specific)")
-    usage: Dict[str, Dict[str, Any]] = Field(..., description="Usage information by type")
-
-    class Config:
-        schema_extra = {
-            "example": {
-                "tenant_id": "550e8400-e29b-41d4-a716-446655440001",
-                "user_id": "550e8400-e29b-41d4-a716-446655440000",
-                "usage": {
-                    "messages_per_day": {
-                        "current": 150,
-                        "quota": 10000,
-                        "remaining": 9850,
-                        "percentage": 1.5
-                    },
-                    "merges_per_day": {
-                        "current": 5,
-                        "quota": 1000,
-                        "remaining": 995,
-                        "percentage": 0.5
-                    }
-                }
-            }
-        }
+    usage: Dict[str, UsageEntry] = Field(..., description="Usage information by type")
+
+    model_config = ConfigDict(json_schema_extra={"example": _USAGE_SUMMARY_EXAMPLE})
 
 # Error schemas
 class ErrorResponse(BaseModel):
@@ -587,11 +716,4 @@ class ErrorResponse(BaseModel):
     detail: Optional[str] = Field(None, description="Additional error details")
     code: Optional[str] = Field(None, description="Error code")
 
-    class Config:
-        schema_extra = {
-            "example": {
-                "error": "Branch not found",
-                "detail": "The specified branch ID does not exist",
-                "code": "BRANCH_NOT_FOUND"
-            }
-        }
+    model_config = ConfigDict(json_schema_extra={"example": _ERROR_RESPONSE_EXAMPLE})
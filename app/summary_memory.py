@@ -1,11 +1,140 @@
 from typing import Dict, List, Optional, Any, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy.engine import Row
+from sqlalchemy import func, desc, insert, update
 from datetime import datetime, timedelta
+from functools import lru_cache
 from app.models import Thread, Message, Summary, Memory, Branch
 from app.llm import estimate_tokens
 import re
 import json
+import hashlib
+
+
+# Prefer google-re2 when installed: its automaton matches in linear time,
+# whereas the lazy [^.!?]*? runs below can backtrack on long replies
+try:
+    import re2 as _regex
+    RE2_AVAILABLE = True
+except ImportError:
+    _regex = re
+    RE2_AVAILABLE = False
+
+# Optional multi-literal prefilter: one Aho-Corasick pass tells whether any
+# trigger word occurs at all, so texts without one skip the regex entirely
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Keywords each extraction pattern hinges on; a match needs one of them
+_FACT_TRIGGERS = (
+    "is", "are", "was", "were", "has", "have", "can", "will", "should", "must",
+    "fact", "information", "data", "statistic",
+    "according to", "research shows", "studies indicate",
+)
+_PREF_TRIGGERS = (
+    "I prefer", "I like", "I want", "I need", "I would like", "I enjoy", "I hate", "I dislike",
+    "favorite", "best", "worst", "better", "worse",
+    "always", "never", "usually", "sometimes",
+)
+_CTX_TRIGGERS = (
+    "I am", "I'm", "I work", "I study", "I live", "I'm from",
+    "currently", "now", "today", "this week", "this month",
+    "project", "work", "study", "research", "task",
+)
+
+# Extraction patterns, compiled once at import. Each extractor's keyword sets
+# are fused into one alternation so the text is scanned in a single pass.
+# Case-insensitivity is inline so the same source compiles under re and re2.
+_FACT_RE = _regex.compile(
+    r'(?i)[A-Z][^.!?]*?(?:' + '|'.join(_FACT_TRIGGERS) + r')[^.!?]*[.!?]'
+)
+
+_PREF_RE = _regex.compile(
+    r'(?i)(?:' + '|'.join(_PREF_TRIGGERS) + r')[^.!?]*[.!?]'
+)
+
+_CTX_RE = _regex.compile(
+    r'(?i)(?:' + '|'.join(_CTX_TRIGGERS) + r')[^.!?]*[.!?]'
+)
+
+
+def _build_prefilter(triggers: Tuple[str, ...]):
+    """Aho-Corasick automaton over the lowercased triggers, if available."""
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    automaton = ahocorasick.Automaton()
+    for trigger in triggers:
+        automaton.add_word(trigger.lower(), trigger)
+    automaton.make_automaton()
+    return automaton
+
+
+_FACT_PREFILTER = _build_prefilter(_FACT_TRIGGERS)
+_PREF_PREFILTER = _build_prefilter(_PREF_TRIGGERS)
+_CTX_PREFILTER = _build_prefilter(_CTX_TRIGGERS)
+
+
+def _may_match(prefilter, text: str) -> bool:
+    """False only if text holds none of the prefilter's trigger words."""
+    if prefilter is None:
+        return True
+    return next(prefilter.iter(text.lower()), None) is not None
+
+
+# Transcript label per role; other roles (e.g. tool) are left out
+_ROLE_PREFIX = {
+    'user': "User: ",
+    'assistant': "Assistant: ",
+    'system': "System: ",
+}
+
+
+def _message_text(content: Any) -> str:
+    """Text of a stored message body (a {"text": ...} dict, or legacy plain value)."""
+    return content.get('text', '') if isinstance(content, dict) else str(content)
+
+
+@lru_cache(maxsize=1024)
+def _generate_rolling_summary(
+    current_summary: str,
+    new_conversation: str,
+    target_tokens: int
+) -> str:
+    """
+    Generate rolling summary by merging current summary with new conversation.
+    
+    Pure in its arguments, so results are memoized: retries, edits and merges
+    replaying the same inputs skip the work (and, once an LLM does this, the
+    call). Both strings are bounded by the summary budget, which keeps the
+    cache small.
+    
+    This is a simple implementation. In production, you'd use an LLM to:
+    1. Analyze the new conversation for key information
+    2. Determine what to add/update in the summary
+    3. Generate a coherent summary within token limits
+    """
+    # For now, use a simple approach: combine and truncate
+    combined = f"{current_summary}\n\nRecent conversation:\n{new_conversation}"
+    
+    # Simple truncation to target tokens (roughly 4 chars per token)
+    target_chars = target_tokens * 4
+    
+    if len(combined) <= target_chars:
+        return combined
+    
+    # Look for a sentence boundary in the last 20% of the kept text before
+    # slicing, so only the final string is built. (Searching the already
+    # ellipsised copy always hit the trailing "...".)
+    cut = target_chars - 3
+    last_period = combined.rfind('.', int(target_chars * 0.8) + 1, cut)
+    if last_period != -1:  # If we can end at a sentence
+        return combined[:last_period+1]
+    
+    # Truncate and add ellipsis
+    return combined[:cut] + "..."
 
 
 class SummaryMemoryManager:
@@ -20,7 +149,7 @@ class SummaryMemoryManager:
         branch_id: str,
         assistant_message: Message,
         target_summary_tokens: int = 200
-    ) -> Tuple[Optional[Summary], List[Memory]]:
+    ) -> Tuple[Optional[Summary], int]:
         """
         Update rolling summary and extract structured memory after assistant message.
         
@@ -31,7 +160,7 @@ class SummaryMemoryManager:
             target_summary_tokens: Target length for summary in tokens
             
         Returns:
-            Tuple of (updated_summary, new_memories)
+            Tuple of (updated_summary, number of memories stored)
         """
         # Get recent conversation context
         recent_messages = self._get_recent_messages(branch_id, limit=20)
@@ -42,15 +171,15 @@ class SummaryMemoryManager:
         )
         
         # Extract structured memory from the assistant message
-        new_memories = self._extract_structured_memory(
-            thread_id, assistant_message, recent_messages
+        memory_count = self._extract_structured_memory(
+            thread_id, assistant_message.id, assistant_message.content, recent_messages
         )
         
-        return updated_summary, new_memories
+        return updated_summary, memory_count
     
-    def _get_recent_messages(self, branch_id: str, limit: int = 20) -> List[Message]:
-        """Get recent messages for context building."""
-        return (self.db.query(Message)
+    def _get_recent_messages(self, branch_id: str, limit: int = 20) -> List[Row]:
+        """Get (role, content) of recent messages for context building."""
+        return (self.db.query(Message.role, Message.content)
                 .filter(Message.branch_id == branch_id)
                 .order_by(Message.created_at.desc())
                 .limit(limit)
@@ -59,45 +188,42 @@ class SummaryMemoryManager:
     def _update_rolling_summary(
         self, 
         thread_id: str, 
-        recent_messages: List[Message],
+        recent_messages: List[Row],
         target_tokens: int
-    ) -> Optional[Summary]:
+    ) -> Summary:
         """
         Update rolling summary based on recent messages.
         
         Strategy:
-        1. Get current summary if it exists
+        1. Retire the current summary (if any), reading its text back
         2. Analyze recent messages for new information
         3. Merge new info into summary, keeping within token limit
         4. Save updated summary
         """
-        # Get current summary
-        current_summary = (self.db.query(Summary)
-                          .filter(
-                              Summary.thread_id == thread_id,
-                              Summary.summary_type == "thread",
-                              Summary.is_current == True
-                          )
-                          .first())
+        # Demote the current summary and fetch its content in one round trip
+        # instead of a SELECT followed by a flushed UPDATE
+        previous_content = self.db.execute(
+            update(Summary)
+            .where(
+                Summary.thread_id == thread_id,
+                Summary.summary_type == "thread",
+                Summary.is_current == True
+            )
+            .values(is_current=False, updated_at=datetime.utcnow())
+            .returning(Summary.content)
+        ).scalars().first()
         
         # Build conversation text from recent messages
-        conversation_text = self._build_conversation_text(recent_messages)
+        conversation_text = self._build_conversation_text(recent_messages, target_tokens * 4)
         
-        # Generate new summary
-        new_summary_text = self._generate_rolling_summary(
-            current_summary.content if current_summary else "",
+        # Generate new summary; never empty, as it always carries the
+        # "Recent conversation" header
+        new_summary_text = _generate_rolling_summary(
+            previous_content or "",
             conversation_text,
             target_tokens
         )
         
-        if not new_summary_text:
-            return current_summary
-        
-        # Mark current summary as not current
-        if current_summary:
-            current_summary.is_current = False
-            current_summary.updated_at = datetime.utcnow()
-        
         # Create new summary
         new_summary = Summary(
             thread_id=thread_id,
@@ -107,6 +233,9 @@ class SummaryMemoryManager:
                 "generated_at": datetime.utcnow().isoformat(),
                 "target_tokens": target_tokens,
                 "message_count": len(recent_messages),
+                "content_hash": hashlib.blake2b(
+                    new_summary_text.encode(), digest_size=16
+                ).hexdigest(),
                 "version": "1.0"
             },
             is_current=True,
@@ -119,65 +248,43 @@ class SummaryMemoryManager:
         
         return new_summary
     
-    def _build_conversation_text(self, messages: List[Message]) -> str:
-        """Build conversation text from messages."""
+    def _build_conversation_text(self, messages: List[Row], max_chars: int) -> str:
+        """
+        Build conversation text from messages.
+        
+        Stops once max_chars have been produced: the rolling summary keeps
+        only that prefix, so longer text would be built just to be cut off.
+        """
         conversation_parts = []
+        remaining = max_chars
         
         for msg in reversed(messages):  # Reverse to get chronological order
-            role = msg.role
-            content = msg.content.get('text', '') if isinstance(msg.content, dict) else str(msg.content)
+            if remaining <= 0:
+                break
             
-            if role == 'user':
-                conversation_parts.append(f"User: {content}")
-            elif role == 'assistant':
-                conversation_parts.append(f"Assistant: {content}")
-            elif role == 'system':
-                conversation_parts.append(f"System: {content}")
+            prefix = _ROLE_PREFIX.get(msg.role)
+            if prefix is None:
+                continue
+            
+            part = prefix + _message_text(msg.content)[:remaining]
+            conversation_parts.append(part)
+            remaining -= len(part) + 1  # +1 for the joining newline
         
         return "\n".join(conversation_parts)
     
-    def _generate_rolling_summary(
-        self, 
-        current_summary: str, 
-        new_conversation: str,
-        target_tokens: int
-    ) -> str:
-        """
-        Generate rolling summary by merging current summary with new conversation.
-        
-        This is a simple implementation. In production, you'd use an LLM to:
-        1. Analyze the new conversation for key information
-        2. Determine what to add/update in the summary
-        3. Generate a coherent summary within token limits
-        """
-        # For now, use a simple approach: combine and truncate
-        combined = f"{current_summary}\n\nRecent conversation:\n{new_conversation}"
-        
-        # Simple truncation to target tokens (roughly 4 chars per token)
-        target_chars = target_tokens * 4
-        
-        if len(combined) <= target_chars:
-            return combined
-        
-        # Truncate and add ellipsis
-        truncated = combined[:target_chars-3] + "..."
-        
-        # Try to end at a sentence boundary
-        last_period = truncated.rfind('.')
-        if last_period > target_chars * 0.8:  # If we can end at a sentence
-            return truncated[:last_period+1]
-        
-        return truncated
-    
     def _extract_structured_memory(
         self, 
         thread_id: str, 
-        assistant_message: Message,
-        recent_messages: List[Message]
-    ) -> List[Memory]:
+        assistant_message_id: str,
+        assistant_content: Any,
+        recent_messages: List[Row]
+    ) -> int:
         """
         Extract structured memory from assistant message and conversation context.
         
+        Rows are written with one multi-row INSERT rather than as ORM objects;
+        returns how many were stored.
+        
         Looks for:
         - Facts mentioned by the assistant
         - User preferences expressed
@@ -186,97 +293,89 @@ class SummaryMemoryManager:
         """
         new_memories = []
         
+        # One timestamp for every memory extracted from this message
+        now = datetime.utcnow()
+        now_iso = now.isoformat()
+        # Keys are unique per thread; microseconds keep turns answered within
+        # the same second (e.g. a message batch) from colliding
+        key_prefix = now.strftime('%Y%m%d_%H%M%S_%f')
+        
         # Get assistant message content
-        content = assistant_message.content.get('text', '') if isinstance(assistant_message.content, dict) else str(assistant_message.content)
+        content = _message_text(assistant_content)
         
         # Extract facts (simple pattern matching for now)
         facts = self._extract_facts(content)
         for i, fact in enumerate(facts):
-            memory = Memory(
-                thread_id=thread_id,
-                memory_type="fact",
-                key=f"fact_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{i}",
-                value=fact,
-                memory_metadata={
+            new_memories.append({
+                "thread_id": thread_id,
+                "memory_type": "fact",
+                "key": f"fact_{key_prefix}_{i}",
+                "value": fact,
+                "memory_metadata": {
                     "source": "assistant_message",
-                    "message_id": assistant_message.id,
-                    "extracted_at": datetime.utcnow().isoformat()
+                    "message_id": assistant_message_id,
+                    "extracted_at": now_iso
                 },
-                confidence="high",
-                source="pattern_extraction",
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
-            )
-            new_memories.append(memory)
+                "confidence": "high",
+                "source": "pattern_extraction",
+                "created_at": now,
+                "updated_at": now
+            })
         
         # Extract user preferences from recent conversation
         preferences = self._extract_preferences(recent_messages)
         for i, pref in enumerate(preferences):
-            memory = Memory(
-                thread_id=thread_id,
-                memory_type="preference",
-                key=f"preference_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{i}",
-                value=pref,
-                memory_metadata={
+            new_memories.append({
+                "thread_id": thread_id,
+                "memory_type": "preference",
+                "key": f"preference_{key_prefix}_{i}",
+                "value": pref,
+                "memory_metadata": {
                     "source": "conversation_analysis",
-                    "extracted_at": datetime.utcnow().isoformat()
+                    "extracted_at": now_iso
                 },
-                confidence="medium",
-                source="conversation_analysis",
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
-            )
-            new_memories.append(memory)
+                "confidence": "medium",
+                "source": "conversation_analysis",
+                "created_at": now,
+                "updated_at": now
+            })
         
         # Extract contextual information
         context = self._extract_context(recent_messages)
         if context:
-            memory = Memory(
-                thread_id=thread_id,
-                memory_type="context",
-                key=f"conversation_context_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
-                value=context,
-                memory_metadata={
+            new_memories.append({
+                "thread_id": thread_id,
+                "memory_type": "context",
+                "key": f"conversation_context_{key_prefix}",
+                "value": context,
+                "memory_metadata": {
                     "source": "conversation_analysis",
-                    "extracted_at": datetime.utcnow().isoformat()
+                    "extracted_at": now_iso
                 },
-                confidence="medium",
-                source="conversation_analysis",
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
-            )
-            new_memories.append(memory)
-        
-        # Save new memories
-        for memory in new_memories:
-            self.db.add(memory)
+                "confidence": "medium",
+                "source": "conversation_analysis",
+                "created_at": now,
+                "updated_at": now
+            })
         
-        self.db.flush()
+        # Save new memories in a single statement
+        if new_memories:
+            self.db.execute(insert(Memory), new_memories)
         
-        return new_memories
+        return len(new_memories)
     
     def _extract_facts(self, content: str) -> List[str]:
         """Extract facts from assistant message content."""
-        facts = []
-        
-        # Simple fact extraction patterns
-        fact_patterns = [
-            r'([A-Z][^.!?]*?(?:is|are|was|were|has|have|can|will|should|must)[^.!?]*[.!?])',
-            r'([A-Z][^.!?]*?(?:fact|information|data|statistic)[^.!?]*[.!?])',
-            r'([A-Z][^.!?]*?(?:according to|research shows|studies indicate)[^.!?]*[.!?])'
-        ]
+        if not _may_match(_FACT_PREFILTER, content):
+            return []
         
-        for pattern in fact_patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            facts.extend(matches)
-        
-        # Remove duplicates and clean up
-        facts = list(set(facts))
-        facts = [fact.strip() for fact in facts if len(fact.strip()) > 20]
+        # Remove duplicates (keeping first-seen order) and clean up
+        stripped = (fact.strip() for fact in dict.fromkeys(_FACT_RE.findall(content)))
+        facts = [fact for fact in stripped if len(fact) > 20]
         
         return facts[:5]  # Limit to 5 facts
     
-    def _extract_preferences(self, messages: List[Message]) -> List[str]:
+    def _extract_preferences(self, messages: List[Row]) -> List[str]:
         """Extract user preferences from conversation."""
         preferences = []
         
@@ -284,26 +383,19 @@ class SummaryMemoryManager:
             if msg.role != 'user':
                 continue
                 
-            content = msg.content.get('text', '') if isinstance(msg.content, dict) else str(msg.content)
+            content = _message_text(msg.content)
             
             # Look for preference indicators
-            preference_patterns = [
-                r'(?:I prefer|I like|I want|I need|I would like|I enjoy|I hate|I dislike)[^.!?]*[.!?]',
-                r'(?:favorite|best|worst|better|worse)[^.!?]*[.!?]',
-                r'(?:always|never|usually|sometimes)[^.!?]*[.!?]'
-            ]
-            
-            for pattern in preference_patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE)
-                preferences.extend(matches)
+            if _may_match(_PREF_PREFILTER, content):
+                preferences.extend(_PREF_RE.findall(content))
         
-        # Clean up and deduplicate
-        preferences = list(set(preferences))
-        preferences = [pref.strip() for pref in preferences if len(pref.strip()) > 10]
+        # Clean up and deduplicate (keeping first-seen order)
+        stripped = (pref.strip() for pref in dict.fromkeys(preferences))
+        preferences = [pref for pref in stripped if len(pref) > 10]
         
         return preferences[:3]  # Limit to 3 preferences
     
-    def _extract_context(self, messages: List[Message]) -> Optional[str]:
+    def _extract_context(self, messages: List[Row]) -> Optional[str]:
         """Extract contextual information from conversation."""
         context_parts = []
         
@@ -312,18 +404,11 @@ class SummaryMemoryManager:
             if msg.role != 'user':
                 continue
                 
-            content = msg.content.get('text', '') if isinstance(msg.content, dict) else str(msg.content)
+            content = _message_text(msg.content)
             
             # Look for context indicators
-            context_patterns = [
-                r'(?:I am|I\'m|I work|I study|I live|I\'m from)[^.!?]*[.!?]',
-                r'(?:currently|now|today|this week|this month)[^.!?]*[.!?]',
-                r'(?:project|work|study|research|task)[^.!?]*[.!?]'
-            ]
-            
-            for pattern in context_patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE)
-                context_parts.extend(matches)
+            if _may_match(_CTX_PREFILTER, content):
+                context_parts.extend(_CTX_RE.findall(content))
         
         if not context_parts:
             return None
@@ -1,10 +1,21 @@
-from datetime import date, datetime, timedelta
-from typing import Optional
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Iterable, Tuple, Dict
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models import UsageRecord, Tenant, User
+from sqlalchemy import func, select, literal, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from fastapi import Request
+from app.models import UsageRecord, Tenant, User, uid
 from app.rate_limiting import quota_manager
 
+# Daily partitions are named usage_records_YYYYMMDD
+USAGE_PARTITION_PREFIX = "usage_records_"
+
+# Quota counted against each rate-limited operation
+_OPERATION_USAGE_TYPES = {
+    "send_message": "messages_per_day",
+    "merge": "merges_per_day",
+}
+
 
 class UsageTracker:
     """Tracks usage for quota management"""
@@ -15,46 +26,87 @@ class UsageTracker:
         tenant_id: str, 
         usage_type: str, 
         user_id: Optional[str] = None,
-        count: int = 1
+        count: int = 1,
+        commit: bool = False,
+        as_of: Optional[date] = None,
+        at: Optional[datetime] = None
     ) -> None:
         """
         Increment usage for a tenant and optionally user.
         
+        Runs as part of the caller's transaction; the caller commits.
+        
         Args:
             db: Database session
             tenant_id: Tenant identifier
             usage_type: Type of usage (e.g., "messages_per_day")
             user_id: Optional user identifier
             count: Amount to increment
+            commit: Commit immediately, for callers outside a request transaction
+            as_of: Day to account against; defaults to today
+            at: Timestamp for written rows; defaults to now (UTC)
+        """
+        UsageTracker.increment_usage_bulk(
+            db, [(tenant_id, usage_type, user_id, count)],
+            commit=commit, as_of=as_of, at=at
+        )
+    
+    @staticmethod
+    def increment_usage_bulk(
+        db: Session,
+        increments: Iterable[Tuple[str, str, Optional[str], int]],
+        commit: bool = False,
+        as_of: Optional[date] = None,
+        at: Optional[datetime] = None
+    ) -> None:
         """
-        today = date.today()
+        Apply several usage increments with a single INSERT ... ON CONFLICT.
         
-        # Find existing usage record
-        usage_record = db.query(UsageRecord).filter(
-            UsageRecord.tenant_id == tenant_id,
-            UsageRecord.user_id == user_id,
-            UsageRecord.usage_type == usage_type,
-            UsageRecord.date == today
-        ).first()
-        
-        if usage_record:
-            # Update existing record
-            usage_record.count += count
-            usage_record.updated_at = datetime.utcnow()
-        else:
-            # Create new record
-            usage_record = UsageRecord(
-                tenant_id=tenant_id,
-                user_id=user_id,
-                usage_type=usage_type,
-                count=count,
-                date=today,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
-            )
-            db.add(usage_record)
+        Runs as part of the caller's transaction; the caller commits.
         
-        db.commit()
+        Args:
+            db: Database session
+            increments: (tenant_id, usage_type, user_id, count) tuples
+            commit: Commit immediately, for callers outside a request transaction
+            as_of: Day to account against; defaults to today
+            at: Timestamp for written rows; defaults to now (UTC)
+        """
+        # Postgres rejects an upsert that touches the same row twice, so
+        # fold duplicate keys together first
+        totals: Dict[Tuple[str, Optional[str], str], int] = {}
+        for tenant_id, usage_type, user_id, count in increments:
+            key = (tenant_id, user_id, usage_type)
+            totals[key] = totals.get(key, 0) + count
+        if not totals:
+            return
+        
+        today = as_of or date.today()
+        timestamp = at or datetime.utcnow()
+        stmt = pg_insert(UsageRecord).values([
+            {
+                "id": uid(),
+                "tenant_id": tenant_id,
+                "user_id": user_id,
+                "usage_type": usage_type,
+                "count": count,
+                "date": today,
+                "created_at": timestamp,
+                "updated_at": timestamp,
+            }
+            for (tenant_id, user_id, usage_type), count in totals.items()
+        ])
+        # The constraint treats NULL user_id as equal, so tenant-level rows
+        # are bumped in place like per-user ones
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_usage_tenant_user_type_date",
+            set_={
+                "count": UsageRecord.count + stmt.excluded.count,
+                "updated_at": stmt.excluded.updated_at,
+            }
+        )
+        db.execute(stmt)
+        if commit:
+            db.commit()
     
     @staticmethod
     def get_usage(
@@ -62,7 +114,8 @@ class UsageTracker:
         tenant_id: str, 
         usage_type: str, 
         user_id: Optional[str] = None,
-        days: int = 1
+        days: int = 1,
+        as_of: Optional[date] = None
     ) -> int:
         """
         Get current usage for a tenant and optionally user.
@@ -73,14 +126,15 @@ class UsageTracker:
             usage_type: Type of usage
             user_id: Optional user identifier
             days: Number of days to look back
+            as_of: Last day of the window; defaults to today
             
         Returns:
             int: Total usage count
         """
-        end_date = date.today()
+        end_date = as_of or date.today()
         start_date = end_date - timedelta(days=days-1)
         
-        query = db.query(func.sum(UsageRecord.count)).filter(
+        query = db.query(func.coalesce(func.sum(UsageRecord.count), 0)).filter(
             UsageRecord.tenant_id == tenant_id,
             UsageRecord.usage_type == usage_type,
             UsageRecord.date >= start_date,
@@ -90,8 +144,7 @@ class UsageTracker:
         if user_id:
             query = query.filter(UsageRecord.user_id == user_id)
         
-        result = query.scalar()
-        return result or 0
+        return query.scalar()
     
     @staticmethod
     def check_and_increment_usage(
@@ -99,10 +152,16 @@ class UsageTracker:
         tenant_id: str, 
         usage_type: str, 
         user_id: Optional[str] = None,
-        count: int = 1
+        count: int = 1,
+        commit: bool = False,
+        as_of: Optional[date] = None,
+        at: Optional[datetime] = None,
+        request: Optional[Request] = None
     ) -> bool:
         """
-        Check quota and increment usage if allowed.
+        Check quota and increment usage if allowed, in a single statement.
+        
+        Runs as part of the caller's transaction; the caller commits.
         
         Args:
             db: Database session
@@ -110,24 +169,75 @@ class UsageTracker:
             usage_type: Type of usage
             user_id: Optional user identifier
             count: Amount to increment
+            commit: Commit immediately, for callers outside a request transaction
+            as_of: Day to account against; defaults to today
+            at: Timestamp for written rows; defaults to now (UTC)
+            request: Current request; on success the usage after the increment
+                and the quota are kept on request.state.rate_limit, so
+                RateLimitHeaders needs no queries of its own
             
         Returns:
             bool: True if quota allows the increment
         """
-        current_usage = UsageTracker.get_usage(db, tenant_id, usage_type, user_id)
         quota = quota_manager.get_tenant_quota(db, tenant_id, usage_type)
+        today = as_of or date.today()
+        timestamp = at or datetime.utcnow()
+        
+        # Today's usage in the same scope get_usage() would sum
+        used = select(func.coalesce(func.sum(UsageRecord.count), 0)).where(
+            UsageRecord.tenant_id == tenant_id,
+            UsageRecord.usage_type == usage_type,
+            UsageRecord.date == today
+        )
+        if user_id:
+            used = used.where(UsageRecord.user_id == user_id)
+        
+        # Insert/bump the counter only when it stays within quota; the check
+        # and the write happen in one statement, so no row comes back when
+        # the quota would be exceeded. RETURNING sees the statement's snapshot,
+        # so the sum there is still the usage from before this increment
+        row = select(
+            literal(uid(), UsageRecord.id.type),
+            literal(tenant_id, UsageRecord.tenant_id.type),
+            literal(user_id, UsageRecord.user_id.type),
+            literal(usage_type, UsageRecord.usage_type.type),
+            literal(count, UsageRecord.count.type),
+            literal(today, UsageRecord.date.type),
+            literal(timestamp, UsageRecord.created_at.type),
+            literal(timestamp, UsageRecord.updated_at.type),
+        ).where(used.scalar_subquery() + count <= quota)
         
-        if current_usage + count <= quota:
-            UsageTracker.increment_usage(db, tenant_id, usage_type, user_id, count)
-            return True
+        stmt = pg_insert(UsageRecord).from_select(
+            ["id", "tenant_id", "user_id", "usage_type", "count", "date", "created_at", "updated_at"],
+            row
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_usage_tenant_user_type_date",
+            set_={
+                "count": UsageRecord.count + stmt.excluded.count,
+                "updated_at": stmt.excluded.updated_at,
+            }
+        ).returning(used.scalar_subquery() + count)
         
-        return False
+        current = db.execute(stmt).scalar()
+        if commit:
+            db.commit()
+        if current is None:
+            return False
+        if request is not None:
+            request.state.rate_limit = {
+                "usage_type": usage_type,
+                "current": current,
+                "quota": quota,
+            }
+        return True
     
     @staticmethod
     def get_usage_summary(
         db: Session, 
         tenant_id: str, 
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        as_of: Optional[date] = None
     ) -> dict:
         """
         Get usage summary for a tenant and optionally user.
@@ -136,6 +246,7 @@ class UsageTracker:
             db: Database session
             tenant_id: Tenant identifier
             user_id: Optional user identifier
+            as_of: Day to account against; defaults to today
             
         Returns:
             dict: Usage summary with current usage and quotas
@@ -147,10 +258,22 @@ class UsageTracker:
             "branches_per_day"
         ]
         
+        # One grouped scan for all usage types instead of one query per type
+        today = as_of or date.today()
+        query = db.query(UsageRecord.usage_type, func.sum(UsageRecord.count)).filter(
+            UsageRecord.tenant_id == tenant_id,
+            UsageRecord.usage_type.in_(usage_types),
+            UsageRecord.date == today
+        )
+        if user_id:
+            query = query.filter(UsageRecord.user_id == user_id)
+        usage_by_type = dict(query.group_by(UsageRecord.usage_type).all())
+        quotas = quota_manager.get_tenant_quotas(db, tenant_id)
+        
         summary = {}
         for usage_type in usage_types:
-            current_usage = UsageTracker.get_usage(db, tenant_id, usage_type, user_id)
-            quota = quota_manager.get_tenant_quota(db, tenant_id, usage_type)
+            current_usage = usage_by_type.get(usage_type, 0)
+            quota = quotas.get(usage_type, 0)
             
             summary[usage_type] = {
                 "current": current_usage,
@@ -162,25 +285,131 @@ class UsageTracker:
         return summary
     
     @staticmethod
-    def cleanup_old_records(db: Session, days_to_keep: int = 30) -> int:
+    def ensure_partitions(
+        db: Session,
+        days_ahead: int = 7,
+        as_of: Optional[date] = None
+    ) -> int:
+        """
+        Create the daily usage_records partitions for today and the coming days.
+        
+        Days without a partition fall into usage_records_default, so this only
+        has to run ahead of time (cleanup_old_records calls it).
+        
+        Args:
+            db: Database session
+            days_ahead: Number of days after today to provision
+            as_of: First day to provision; defaults to today
+            
+        Returns:
+            int: Number of partitions created
+        """
+        if db.get_bind().dialect.name != "postgresql":
+            return 0
+        
+        existing = set(_usage_partitions(db))
+        today = as_of or date.today()
+        created = 0
+        for offset in range(days_ahead + 1):
+            day = today + timedelta(days=offset)
+            if day in existing:
+                continue
+            # Rows for this day already routed to the default partition would
+            # fall inside the new bounds and make the CREATE fail
+            if db.execute(
+                text("SELECT 1 FROM usage_records_default WHERE date = :day LIMIT 1"),
+                {"day": day}
+            ).first():
+                continue
+            db.execute(text(
+                f"CREATE TABLE {USAGE_PARTITION_PREFIX}{day:%Y%m%d} "
+                f"PARTITION OF usage_records "
+                f"FOR VALUES FROM ('{day.isoformat()}') "
+                f"TO ('{(day + timedelta(days=1)).isoformat()}')"
+            ))
+            created += 1
+        return created
+    
+    @staticmethod
+    def cleanup_old_records(
+        db: Session,
+        days_to_keep: int = 30,
+        as_of: Optional[date] = None
+    ) -> int:
         """
         Clean up old usage records.
         
+        On PostgreSQL usage_records is partitioned by day, so expired days are
+        dropped as whole tables instead of deleted row by row (no WAL churn or
+        VACUUM debt). Leftover rows in the default partition, and every row on
+        other backends, are still removed with a DELETE. Upcoming partitions
+        are provisioned on the way out.
+        
         Args:
             db: Database session
             days_to_keep: Number of days of records to keep
+            as_of: Day retention counts back from; defaults to today
             
         Returns:
-            int: Number of records deleted
+            int: Number of partitions dropped (records deleted on backends
+            without partitioning)
         """
-        cutoff_date = date.today() - timedelta(days=days_to_keep)
+        today = as_of or date.today()
+        cutoff_date = today - timedelta(days=days_to_keep)
+        
+        if db.get_bind().dialect.name != "postgresql":
+            deleted_count = db.query(UsageRecord).filter(
+                UsageRecord.date < cutoff_date
+            ).delete()
+            db.commit()
+            return deleted_count
         
-        deleted_count = db.query(UsageRecord).filter(
+        dropped = 0
+        for day, name in _usage_partitions(db).items():
+            if day < cutoff_date:
+                db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                dropped += 1
+        
+        # Only the default partition can still hold expired rows
+        db.query(UsageRecord).filter(
             UsageRecord.date < cutoff_date
-        ).delete()
+        ).delete(synchronize_session=False)
         
+        UsageTracker.ensure_partitions(db, as_of=today)
         db.commit()
-        return deleted_count
+        return dropped
+
+
+def _usage_partitions(db: Session) -> Dict[date, str]:
+    """Daily partitions of usage_records, keyed by the day they hold."""
+    names = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'usage_records'::regclass"
+    )).scalars()
+    partitions = {}
+    for name in names:
+        suffix = name[len(USAGE_PARTITION_PREFIX):]
+        if name.startswith(USAGE_PARTITION_PREFIX) and suffix.isdigit():
+            partitions[datetime.strptime(suffix, "%Y%m%d").date()] = name
+    return partitions
+
+
+# (day, epoch seconds of the following midnight); recomputed once per day
+_quota_reset: Tuple[Optional[date], int] = (None, 0)
+
+
+def _quota_reset_timestamp(today: date) -> int:
+    """Epoch timestamp at which today's daily quotas reset."""
+    global _quota_reset
+    day, reset_ts = _quota_reset
+    if day != today:
+        # Daily usage is keyed by the server's local date, so the reset is
+        # its next local midnight; timestamp() on a naive datetime is portable
+        # where strftime("%s") is a glibc extension
+        reset_ts = int(datetime.combine(today + timedelta(days=1), time.min).timestamp())
+        _quota_reset = (today, reset_ts)
+    return reset_ts
 
 
 class RateLimitHeaders:
@@ -191,7 +420,8 @@ class RateLimitHeaders:
         db: Session,
         tenant_id: str,
         user_id: str,
-        operation: str
+        operation: str,
+        request: Optional[Request] = None
     ) -> dict:
         """
         Get rate limit headers for response.
@@ -201,28 +431,36 @@ class RateLimitHeaders:
             tenant_id: Tenant identifier
             user_id: User identifier
             operation: Operation type
+            request: Current request; reuses the usage and quota the rate
+                limit check left on request.state instead of querying again
             
         Returns:
             dict: Headers dictionary
         """
-        from app.rate_limiting import rate_limiter
+        from app.rate_limiting import rate_limit_middleware
         
         headers = {}
         
         # Get current usage for quota-based operations
-        if operation in ["send_message", "merge"]:
-            usage_type = f"{operation}s_per_day"
-            current_usage = UsageTracker.get_usage(db, tenant_id, usage_type, user_id)
-            quota = quota_manager.get_tenant_quota(db, tenant_id, usage_type)
+        usage_type = _OPERATION_USAGE_TYPES.get(operation)
+        if usage_type:
+            checked = getattr(request.state, "rate_limit", None) if request is not None else None
+            if checked and checked["usage_type"] == usage_type:
+                current_usage, quota = checked["current"], checked["quota"]
+            else:
+                current_usage = UsageTracker.get_usage(db, tenant_id, usage_type, user_id)
+                quota = quota_manager.get_tenant_quota(db, tenant_id, usage_type)
             
             headers.update({
                 "X-RateLimit-Limit": str(quota),
                 "X-RateLimit-Remaining": str(max(0, quota - current_usage)),
-                "X-RateLimit-Reset": str(int((date.today() + timedelta(days=1)).strftime("%s")))
+                "X-RateLimit-Reset": str(_quota_reset_timestamp(date.today()))
             })
         
-        # Get token bucket info for rate limiting
-        bucket_key = rate_limiter._get_bucket_key(operation, tenant_id, user_id)
+        # Get token bucket info for rate limiting: the caller's own bucket in
+        # the limiter the routes check against
+        rate_limiter = rate_limit_middleware.rate_limiter
+        bucket_key = rate_limiter._get_bucket_key(f"{operation}_user", user_id=user_id)
         if bucket_key in rate_limiter.buckets:
             bucket = rate_limiter.buckets[bucket_key]
             headers.update({
@@ -11,28 +11,36 @@ Usage:
     python research_dag.py
 """
 
-import asyncio
 import sys
 import os
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import uuid
 
 # Add the SDK to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sdk', 'python'))
 
 from convohub import ConvoHubClient, DiffMode
 
+_SEP = "=" * 60
+
 class ResearchDAGExample:
+    _ROLE_EMOJI = {"user": "👤", "assistant": "🤖", "system": "⚙️"}
+    _ROLE_UPPER = {role: role.upper() for role in _ROLE_EMOJI}
+    
     def __init__(self, base_url: str = "http://127.0.0.1:8000"):
         self.client = ConvoHubClient(base_url)
         self.thread = None
         self.main_branch = None
         self.branches = {}
+        self.merge_key = None
         
     def print_step(self, step: str, description: str):
         """Print a formatted step header"""
-        print(f"\n{'='*60}")
+        # stdout is block-buffered (see __main__); show the finished step
+        sys.stdout.flush()
+        print(f"\n{_SEP}")
         print(f"STEP {step}: {description}")
-        print(f"{'='*60}")
+        print(_SEP)
     
     def print_branch_info(self, branch_name: str, branch_id: str):
         """Print branch information"""
@@ -40,9 +48,7 @@ class ResearchDAGExample:
     
     def print_message(self, role: str, content: str):
         """Print a formatted message"""
-        role_emoji = {"user": "👤", "assistant": "🤖", "system": "⚙️"}
-        emoji = role_emoji.get(role, "💬")
-        print(f"{emoji} {role.upper()}: {content}")
+        print(f"{self._ROLE_EMOJI.get(role, '💬')} {self._ROLE_UPPER.get(role) or role.upper()}: {content}")
     
     def run(self):
         """Run the complete research DAG example"""
@@ -87,119 +93,89 @@ class ResearchDAGExample:
             # Step 4: Create Three Research Branches
             self.print_step("4", "Create Three Research Branches")
             
-            # Branch 1: Scientific Research
-            scientific_branch = self.client.create_branch(
-                thread_id=self.thread.id,
-                name="scientific-research",
-                description="Focus on scientific evidence and data",
-                created_from_branch_id=self.main_branch.id
-            )
-            self.branches["scientific"] = scientific_branch
-            self.print_branch_info("Scientific Research", scientific_branch.id)
-            
-            # Branch 2: Economic Analysis
-            economic_branch = self.client.create_branch(
-                thread_id=self.thread.id,
-                name="economic-analysis", 
-                description="Focus on economic impacts and cost-benefit analysis",
-                created_from_branch_id=self.main_branch.id
-            )
-            self.branches["economic"] = economic_branch
-            self.print_branch_info("Economic Analysis", economic_branch.id)
-            
-            # Branch 3: Policy Solutions
-            policy_branch = self.client.create_branch(
-                thread_id=self.thread.id,
-                name="policy-solutions",
-                description="Focus on policy recommendations and implementation",
-                created_from_branch_id=self.main_branch.id
-            )
-            self.branches["policy"] = policy_branch
-            self.print_branch_info("Policy Solutions", policy_branch.id)
-            
-            # Step 5: Develop Each Branch
-            self.print_step("5", "Develop Each Research Branch")
-            
-            # Scientific Research Branch
-            print("\n🔬 Developing Scientific Research Branch:")
-            response = self.client.send_message(
-                branch_id=scientific_branch.id,
-                role="user", 
-                text="Focus on the latest scientific evidence about climate change impacts. What are the most concerning findings from recent studies?"
-            )
-            self.print_message("user", "Focus on the latest scientific evidence about climate change impacts. What are the most concerning findings from recent studies?")
-            
-            # Economic Analysis Branch
-            print("\n💰 Developing Economic Analysis Branch:")
-            response = self.client.send_message(
-                branch_id=economic_branch.id,
-                role="user",
-                text="Analyze the economic costs of climate change and the financial benefits of different mitigation strategies."
-            )
-            self.print_message("user", "Analyze the economic costs of climate change and the financial benefits of different mitigation strategies.")
-            
-            # Policy Solutions Branch
-            print("\n📋 Developing Policy Solutions Branch:")
-            response = self.client.send_message(
-                branch_id=policy_branch.id,
-                role="user",
-                text="What are the most effective policy interventions that governments can implement to address climate change?"
-            )
-            self.print_message("user", "What are the most effective policy interventions that governments can implement to address climate change?")
+            # The research branches are independent of each other, so they
+            # are created, and then developed, concurrently
+            research_plan = [
+                # (key, label, branch name, description, emoji, develop question)
+                ("scientific", "Scientific Research", "scientific-research",
+                 "Focus on scientific evidence and data", "🔬",
+                 "Focus on the latest scientific evidence about climate change impacts. What are the most concerning findings from recent studies?"),
+                ("economic", "Economic Analysis", "economic-analysis",
+                 "Focus on economic impacts and cost-benefit analysis", "💰",
+                 "Analyze the economic costs of climate change and the financial benefits of different mitigation strategies."),
+                ("policy", "Policy Solutions", "policy-solutions",
+                 "Focus on policy recommendations and implementation", "📋",
+                 "What are the most effective policy interventions that governments can implement to address climate change?"),
+            ]
+            
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                branch_futures = [
+                    executor.submit(
+                        self.client.create_branch,
+                        self.thread.id,
+                        name,
+                        description=description,
+                        created_from_branch_id=self.main_branch.id
+                    )
+                    for _, _, name, description, _, _ in research_plan
+                ]
+                for (key, label, *_), future in zip(research_plan, branch_futures):
+                    self.branches[key] = future.result()
+                    self.print_branch_info(label, self.branches[key].id)
+                
+                scientific_branch = self.branches["scientific"]
+                economic_branch = self.branches["economic"]
+                policy_branch = self.branches["policy"]
+                
+                # Step 5: Develop Each Branch
+                self.print_step("5", "Develop Each Research Branch")
+                
+                responses = list(executor.map(
+                    lambda plan: self.client.send_message(self.branches[plan[0]].id, "user", plan[5]),
+                    research_plan
+                ))
+                for _, label, _, _, emoji, question in research_plan:
+                    print(f"\n{emoji} Developing {label} Branch:")
+                    self.print_message("user", question)
             
             # Step 6: Merge Branches
             self.print_step("6", "Merge Research Branches")
             
-            print("🔄 Merging scientific research into main branch...")
-            merge1 = self.client.merge(
-                thread_id=self.thread.id,
-                source_branch_id=scientific_branch.id,
-                target_branch_id=self.main_branch.id,
-                strategy="resolver",
-                idempotency_key=f"merge-scientific-{datetime.now().timestamp()}"
-            )
-            print(f"✅ Scientific research merged: {merge1.id}")
-            
-            print("🔄 Merging economic analysis into main branch...")
-            merge2 = self.client.merge(
-                thread_id=self.thread.id,
-                source_branch_id=economic_branch.id,
-                target_branch_id=self.main_branch.id,
-                strategy="resolver",
-                idempotency_key=f"merge-economic-{datetime.now().timestamp()}"
-            )
-            print(f"✅ Economic analysis merged: {merge2.id}")
-            
-            print("🔄 Merging policy solutions into main branch...")
-            merge3 = self.client.merge(
+            # One key for the batch, generated once for this run, so a retried
+            # call replays the server's stored result instead of merging again
+            self.merge_key = f"merge-batch-{uuid.uuid4().hex}"
+            
+            # All three merge into main, in order, in one request
+            merge_plan = [
+                ("Scientific research", scientific_branch),
+                ("Economic analysis", economic_branch),
+                ("Policy solutions", policy_branch),
+            ]
+            print("🔄 Merging scientific, economic and policy research into main branch...")
+            merges = self.client.merge_batch(
                 thread_id=self.thread.id,
-                source_branch_id=policy_branch.id,
                 target_branch_id=self.main_branch.id,
-                strategy="resolver",
-                idempotency_key=f"merge-policy-{datetime.now().timestamp()}"
+                sources=[(branch.id, "resolver") for _, branch in merge_plan],
+                idempotency_key=self.merge_key
             )
-            print(f"✅ Policy solutions merged: {merge3.id}")
+            for (label, _), merge in zip(merge_plan, merges):
+                print(f"✅ {label} merged: {merge.id}")
             
             # Step 7: Follow-up Questions
             self.print_step("7", "Follow-up Questions Based on Merged Research")
             
             print("🤔 Asking follow-up questions based on merged research...")
             
-            # Follow-up 1: Implementation
-            response = self.client.send_message(
-                branch_id=self.main_branch.id,
-                role="user",
-                text="Based on the scientific evidence, economic analysis, and policy recommendations we've gathered, what are the most practical next steps for immediate implementation?"
-            )
-            self.print_message("user", "Based on the scientific evidence, economic analysis, and policy recommendations we've gathered, what are the most practical next steps for immediate implementation?")
-            
-            # Follow-up 2: Stakeholder Engagement
-            response = self.client.send_message(
-                branch_id=self.main_branch.id,
-                role="user",
-                text="How can we best engage different stakeholders (governments, businesses, communities) to implement these solutions effectively?"
-            )
-            self.print_message("user", "How can we best engage different stakeholders (governments, businesses, communities) to implement these solutions effectively?")
+            # Both follow-ups go to the main branch, so send them in one request
+            follow_ups = [
+                # Follow-up 1: Implementation
+                ("user", "Based on the scientific evidence, economic analysis, and policy recommendations we've gathered, what are the most practical next steps for immediate implementation?", "implementation"),
+                # Follow-up 2: Stakeholder Engagement
+                ("user", "How can we best engage different stakeholders (governments, businesses, communities) to implement these solutions effectively?", "stakeholders"),
+            ]
+            responses = self.client.send_messages_batch(self.main_branch.id, follow_ups)
+            for role, text, _ in follow_ups:
+                self.print_message(role, text)
             
             # Step 8: Analyze Differences
             self.print_step("8", "Analyze Branch Differences")
@@ -246,10 +222,14 @@ class ResearchDAGExample:
             
         except Exception as e:
             print(f"❌ Error: {e}")
+            sys.stdout.flush()  # keep the error ahead of the stderr traceback
             import traceback
             traceback.print_exc()
 
 if __name__ == "__main__":
+    # Write step by step rather than once per line on a terminal
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(line_buffering=False)
     print("🚀 Starting ConvoHub Research DAG Example")
     print("This example demonstrates branching conversations for research workflows")
     
@@ -0,0 +1,32 @@
+"""Add id to message keyset index
+
+Revision ID: 4e6b8d1f3a27
+Revises: 9a4f0c7d2e18
+Create Date: 2026-10-16 15:21:08.630417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e6b8d1f3a27'
+down_revision: Union[str, Sequence[str], None] = '9a4f0c7d2e18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Message pages seek on (created_at, id); with id in the index the whole
+    # row comparison is an index condition instead of a post-filter
+    op.drop_index('ix_messages_branch_created', table_name='messages')
+    op.create_index('ix_messages_branch_created', 'messages', ['branch_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_branch_created', table_name='messages')
+    op.create_index('ix_messages_branch_created', 'messages', ['branch_id', 'created_at'], unique=False)
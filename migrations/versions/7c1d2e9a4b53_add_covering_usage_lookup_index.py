@@ -0,0 +1,37 @@
+"""Add covering usage lookup index
+
+Revision ID: 7c1d2e9a4b53
+Revises: e1b14c43476c
+Create Date: 2026-10-16 09:12:41.508213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1d2e9a4b53'
+down_revision: Union[str, Sequence[str], None] = 'e1b14c43476c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_usage_lookup',
+        'usage_records',
+        ['tenant_id', 'usage_type', 'date', 'user_id'],
+        unique=False,
+        postgresql_include=['count'],
+    )
+    # Leading-prefix duplicate of ix_usage_lookup
+    op.drop_index('ix_usage_tenant_type_date', table_name='usage_records')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_usage_tenant_type_date', 'usage_records', ['tenant_id', 'usage_type', 'date'], unique=False)
+    op.drop_index('ix_usage_lookup', table_name='usage_records')
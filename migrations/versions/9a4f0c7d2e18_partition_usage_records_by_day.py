@@ -0,0 +1,99 @@
+"""Partition usage records by day
+
+Revision ID: 9a4f0c7d2e18
+Revises: 7c1d2e9a4b53
+Create Date: 2026-10-16 14:03:27.114870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4f0c7d2e18'
+down_revision: Union[str, Sequence[str], None] = '7c1d2e9a4b53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_usage_records(partitioned: bool) -> None:
+    """Create usage_records with its constraints and indexes."""
+    op.create_table('usage_records',
+    sa.Column('id', sa.UUID(as_uuid=False), nullable=False),
+    sa.Column('tenant_id', sa.UUID(as_uuid=False), nullable=False),
+    sa.Column('user_id', sa.UUID(as_uuid=False), nullable=True),
+    sa.Column('usage_type', sa.String(length=50), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.CheckConstraint('count >= 0', name='ck_usage_count_positive'),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    # A partitioned table's primary key must include the partition key
+    sa.PrimaryKeyConstraint(*(('id', 'date') if partitioned else ('id',)), name='usage_records_pkey'),
+    sa.UniqueConstraint('tenant_id', 'user_id', 'usage_type', 'date', name='uq_usage_tenant_user_type_date'),
+    **({'postgresql_partition_by': 'RANGE (date)'} if partitioned else {})
+    )
+    op.create_index('ix_usage_date', 'usage_records', ['date'], unique=False)
+    op.create_index(op.f('ix_usage_records_tenant_id'), 'usage_records', ['tenant_id'], unique=False)
+    op.create_index(op.f('ix_usage_records_user_id'), 'usage_records', ['user_id'], unique=False)
+    op.create_index(
+        'ix_usage_lookup',
+        'usage_records',
+        ['tenant_id', 'usage_type', 'date', 'user_id'],
+        unique=False,
+        postgresql_include=['count'],
+    )
+    op.create_index('ix_usage_user_type_date', 'usage_records', ['user_id', 'usage_type', 'date'], unique=False)
+
+
+def _retire_usage_records() -> None:
+    """Rename usage_records aside, freeing its constraint and index names."""
+    op.rename_table('usage_records', 'usage_records_old')
+    op.drop_index('ix_usage_user_type_date', table_name='usage_records_old')
+    op.drop_index('ix_usage_lookup', table_name='usage_records_old')
+    op.drop_index(op.f('ix_usage_records_user_id'), table_name='usage_records_old')
+    op.drop_index(op.f('ix_usage_records_tenant_id'), table_name='usage_records_old')
+    op.drop_index('ix_usage_date', table_name='usage_records_old')
+    op.drop_constraint('uq_usage_tenant_user_type_date', 'usage_records_old', type_='unique')
+    op.drop_constraint('ck_usage_count_positive', 'usage_records_old', type_='check')
+    op.drop_constraint('usage_records_pkey', 'usage_records_old', type_='primary')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _retire_usage_records()
+    _create_usage_records(partitioned=True)
+    op.execute("CREATE TABLE usage_records_default PARTITION OF usage_records DEFAULT")
+    # One partition per day already holding data, plus the coming week;
+    # UsageTracker.ensure_partitions keeps provisioning from here on
+    op.execute("""
+        DO $$
+        DECLARE d date;
+        BEGIN
+            FOR d IN
+                SELECT DISTINCT date FROM usage_records_old
+                UNION
+                SELECT generate_series(current_date, current_date + 7, interval '1 day')::date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF usage_records FOR VALUES FROM (%L) TO (%L)',
+                    'usage_records_' || to_char(d, 'YYYYMMDD'), d, d + 1
+                );
+            END LOOP;
+        END $$;
+    """)
+    op.execute("INSERT INTO usage_records SELECT * FROM usage_records_old")
+    op.drop_table('usage_records_old')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _retire_usage_records()
+    _create_usage_records(partitioned=False)
+    op.execute("INSERT INTO usage_records SELECT * FROM usage_records_old")
+    # Dropping the partitioned parent drops its partitions with it
+    op.drop_table('usage_records_old')
@@ -0,0 +1,50 @@
+"""Store message content as jsonb
+
+Revision ID: b58e2a9c71d4
+Revises: 4e6b8d1f3a27
+Create Date: 2026-10-16 15:48:52.207163
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b58e2a9c71d4'
+down_revision: Union[str, Sequence[str], None] = '4e6b8d1f3a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column) pairs moved from json to jsonb
+_JSONB_COLUMNS = (
+    ('messages', 'content'),
+    ('messages', 'state_snapshot'),
+    ('merges', 'summary'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column in _JSONB_COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=postgresql.JSONB(astext_type=sa.Text()),
+            existing_type=sa.JSON(),
+            postgresql_using=f'{column}::jsonb',
+        )
+    op.create_index('ix_messages_content_gin', 'messages', ['content'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_content_gin', table_name='messages', postgresql_using='gin')
+    for table, column in _JSONB_COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=sa.JSON(),
+            existing_type=postgresql.JSONB(astext_type=sa.Text()),
+            postgresql_using=f'{column}::json',
+        )
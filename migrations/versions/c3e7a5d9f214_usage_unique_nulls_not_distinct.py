@@ -0,0 +1,62 @@
+"""Treat NULL user_id as one tenant-level usage row
+
+Revision ID: c3e7a5d9f214
+Revises: b58e2a9c71d4
+Create Date: 2026-10-16 17:12:40.518093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e7a5d9f214'
+down_revision: Union[str, Sequence[str], None] = 'b58e2a9c71d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_UNIQUE_COLUMNS = ['tenant_id', 'user_id', 'usage_type', 'date']
+
+# Tenant-level counters that were appended as separate rows, one group per
+# (tenant, type, day), keeping the lowest id
+_NULL_USER_GROUPS = """
+    SELECT tenant_id, usage_type, date, min(id::text)::uuid AS keep_id, sum(count) AS total
+    FROM usage_records
+    WHERE user_id IS NULL
+    GROUP BY tenant_id, usage_type, date
+    HAVING count(*) > 1
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fold duplicate tenant-level rows into one before the constraint can see them
+    op.execute(f"""
+        UPDATE usage_records u SET count = g.total
+        FROM ({_NULL_USER_GROUPS}) g
+        WHERE u.id = g.keep_id AND u.date = g.date
+    """)
+    op.execute(f"""
+        DELETE FROM usage_records u
+        USING ({_NULL_USER_GROUPS}) g
+        WHERE u.user_id IS NULL
+        AND u.tenant_id = g.tenant_id
+        AND u.usage_type = g.usage_type
+        AND u.date = g.date
+        AND u.id <> g.keep_id
+    """)
+    op.drop_constraint('uq_usage_tenant_user_type_date', 'usage_records', type_='unique')
+    # PostgreSQL 15+: NULL user_id now conflicts, so upserts bump the single
+    # tenant-level row instead of appending a new one
+    op.create_unique_constraint(
+        'uq_usage_tenant_user_type_date', 'usage_records', _UNIQUE_COLUMNS,
+        postgresql_nulls_not_distinct=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_usage_tenant_user_type_date', 'usage_records', type_='unique')
+    op.create_unique_constraint('uq_usage_tenant_user_type_date', 'usage_records', _UNIQUE_COLUMNS)
@@ -4,7 +4,7 @@ ConvoHub Python SDK
 A minimal Python client for the ConvoHub API.
 """
 
-from .client import ConvoHubClient
+from .client import ConvoHubClient, AsyncConvoHubClient
 from .models import (
     Thread, Branch, Message, Merge, DiffResponse,
     DiffMode, MemoryDiff, SummaryDiff, MessageRange
@@ -12,7 +12,7 @@ from .models import (
 
 __version__ = "0.1.0"
 __all__ = [
-    "ConvoHubClient",
+    "ConvoHubClient", "AsyncConvoHubClient",
     "Thread", "Branch", "Message", "Merge", "DiffResponse",
     "DiffMode", "MemoryDiff", "SummaryDiff", "MessageRange"
 ]
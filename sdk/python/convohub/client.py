@@ -5,13 +5,111 @@ Main client for interacting with the ConvoHub API.
 """
 
 import requests
-import json
-from typing import List, Dict, Any, Optional
-from datetime import datetime
-from .models import (
-    Thread, Branch, Message, Merge, DiffResponse,
-    DiffMode, MemoryDiff, SummaryDiff, MessageRange
-)
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import threading
+import uuid
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple, Iterator, AsyncIterator
+import msgspec
+from .models import Thread, Branch, Message, Merge, DiffResponse, DiffMode
+
+try:
+    import httpx
+except ImportError:  # the async client is an optional extra
+    httpx = None
+
+
+def _compact(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Request body without its unset (None) fields."""
+    return {key: value for key, value in data.items() if value is not None}
+
+
+def _merge_batch_payload(thread_id: str, target_branch_id: str, sources: List[Tuple[str, str]],
+                         idempotency_key: Optional[str]) -> Dict[str, Any]:
+    """Request body for merge:batch"""
+    return {
+        "thread_id": thread_id,
+        "target_branch_id": target_branch_id,
+        "merges": [
+            {"source_branch_id": source_branch_id, "strategy": strategy}
+            for source_branch_id, strategy in sources
+        ],
+        "idempotency_key": idempotency_key or uuid.uuid4().hex,
+    }
+
+
+def _batch_payload(messages: List[Tuple[str, ...]]) -> Dict[str, Any]:
+    """Request body for messages:batch; custom_id defaults to the position."""
+    return {
+        "messages": [
+            {
+                "role": message[0],
+                "text": message[1],
+                "custom_id": message[2] if len(message) > 2 else str(i),
+            }
+            for i, message in enumerate(messages)
+        ]
+    }
+
+
+class _MessagePage(msgspec.Struct):
+    """One page of a branch's messages"""
+    messages: List[Message]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+
+# Codecs are built once; each decoder parses response bytes straight into its type
+_ENCODE_JSON = msgspec.json.Encoder().encode
+_DECODE_JSON = msgspec.json.Decoder()
+_DECODE_THREAD = msgspec.json.Decoder(Thread)
+_DECODE_BRANCH = msgspec.json.Decoder(Branch)
+_DECODE_MESSAGE = msgspec.json.Decoder(Message)
+_DECODE_MESSAGE_PAGE = msgspec.json.Decoder(_MessagePage)
+_DECODE_MERGE = msgspec.json.Decoder(Merge)
+_DECODE_MERGES = msgspec.json.Decoder(Dict[str, List[Merge]])
+_DECODE_DIFF = msgspec.json.Decoder(DiffResponse)
+
+_DiffKey = Tuple[str, str, DiffMode]
+_DiffEntry = Tuple[str, DiffResponse]
+
+
+class _DiffCache:
+    """
+    Recently fetched diffs with their ETags, least recently used evicted.
+    
+    A cached diff is sent back as If-None-Match; the server answers 304
+    while nothing the diff reads has changed, and the cached diff is reused.
+    """
+    
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[_DiffKey, _DiffEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: _DiffKey) -> Optional[_DiffEntry]:
+        with self._lock:
+            return self._entries.get(key)
+    
+    def _put(self, key: _DiffKey, entry: _DiffEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def resolve(self, key: _DiffKey, entry: Optional[_DiffEntry], response: Any) -> DiffResponse:
+        """Diff for a (requests or httpx) response to a possibly conditional GET"""
+        if response.status_code == 304 and entry is not None:
+            self._put(key, entry)
+            return entry[1]
+        response.raise_for_status()
+        diff = _DECODE_DIFF.decode(response.content)
+        etag = response.headers.get("ETag")
+        if etag:
+            self._put(key, (etag, diff))
+        return diff
 
 
 class ConvoHubClient:
@@ -28,16 +126,43 @@ class ConvoHubClient:
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
         self.session = requests.Session()
+        self._diff_cache = _DiffCache()
+        # One host, so one pool sized for concurrent calls from several
+        # threads; gateway errors are retried on the same kept-alive pool
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=16,
+            max_retries=Retry(total=3, backoff_factor=0.1,
+                              status_forcelist=[502, 503, 504], raise_on_status=False),
+        )
+        self.session.mount(self.base_url.split("://")[0] + "://", adapter)
+        # Bodies are sent pre-encoded, so the content type is set once here
+        self.session.headers["Content-Type"] = "application/json"
         
         if api_key:
             self.session.headers.update({"Authorization": f"Bearer {api_key}"})
     
-    def _make_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
-        """Make an HTTP request to the API"""
+    def warm_up(self) -> None:
+        """
+        Open a pooled connection ahead of the first API call.
+        
+        Pays the TCP/TLS handshake up front so later calls reuse the warm
+        socket. Best effort: a slow or unreachable server is ignored.
+        """
+        try:
+            self.session.get(f"{self.base_url}/health", timeout=1)
+        except requests.RequestException:
+            pass
+    
+    def _make_request(self, method: str, endpoint: str,
+                      decoder: msgspec.json.Decoder = _DECODE_JSON, **kwargs) -> Any:
+        """Make an HTTP request to the API and decode the JSON response"""
         url = f"{self.base_url}{endpoint}"
+        if "json" in kwargs:
+            kwargs["data"] = _ENCODE_JSON(kwargs.pop("json"))
         response = self.session.request(method, url, **kwargs)
         response.raise_for_status()
-        return response.json()
+        return decoder.decode(response.content)
     
     def login(self, email: str, tenant_domain: str, password: str) -> str:
         """
@@ -75,12 +200,9 @@ class ConvoHubClient:
         Returns:
             Created thread
         """
-        data = {"title": title}
-        if description:
-            data["description"] = description
+        data = _compact({"title": title, "description": description})
             
-        response = self._make_request("POST", "/v1/threads", json=data)
-        return Thread(**response)
+        return self._make_request("POST", "/v1/threads", _DECODE_THREAD, json=data)
     
     def create_branch(self, thread_id: str, name: str, description: Optional[str] = None,
                      created_from_branch_id: Optional[str] = None) -> Branch:
@@ -96,14 +218,13 @@ class ConvoHubClient:
         Returns:
             Created branch
         """
-        data = {"name": name}
-        if description:
-            data["description"] = description
-        if created_from_branch_id:
-            data["created_from_branch_id"] = created_from_branch_id
+        data = _compact({
+            "name": name,
+            "description": description,
+            "created_from_branch_id": created_from_branch_id,
+        })
             
-        response = self._make_request("POST", f"/v1/threads/{thread_id}/branches", json=data)
-        return Branch(**response)
+        return self._make_request("POST", f"/v1/threads/{thread_id}/branches", _DECODE_BRANCH, json=data)
     
     def send_message(self, branch_id: str, role: str, text: str) -> Dict[str, str]:
         """
@@ -117,13 +238,31 @@ class ConvoHubClient:
         Returns:
             Dictionary with user_message_id and assistant_message_id
         """
-        data = {
-            "role": role,
-            "text": text
+        result = self.send_messages_batch(branch_id, [(role, text)])[0]
+        return {
+            "user_message_id": result["user_message_id"],
+            "assistant_message_id": result["assistant_message_id"],
         }
+    
+    def send_messages_batch(self, branch_id: str, messages: List[Tuple[str, ...]]) -> List[Dict[str, str]]:
+        """
+        Send several messages to a branch in a single request.
         
-        response = self._make_request("POST", f"/v1/branches/{branch_id}/messages", json=data)
-        return response
+        The server answers them in order, so each message sees the replies
+        to the ones before it.
+        
+        Args:
+            branch_id: Target branch ID
+            messages: (role, text) or (role, text, custom_id) tuples; the
+                custom_id defaults to the message's position in the list
+            
+        Returns:
+            One dictionary per message, in submission order, with custom_id,
+            user_message_id and assistant_message_id
+        """
+        data = _batch_payload(messages)
+        response = self._make_request("POST", f"/v1/branches/{branch_id}/messages:batch", json=data)
+        return response["results"]
     
     def list_messages(self, branch_id: str, cursor: Optional[str] = None, limit: int = 50) -> Dict[str, Any]:
         """
@@ -131,7 +270,7 @@ class ConvoHubClient:
         
         Args:
             branch_id: Branch ID
-            cursor: Optional pagination cursor
+            cursor: Optional pagination cursor (next_cursor of the previous page)
             limit: Maximum number of messages to return
             
         Returns:
@@ -143,6 +282,55 @@ class ConvoHubClient:
             
         return self._make_request("GET", f"/v1/branches/{branch_id}/messages", params=params)
     
+    def iter_all_messages(self, branch_id: str, page_size: int = 100) -> Iterator[Message]:
+        """
+        Iterate over every message in a branch, oldest first, page by page.
+        
+        Follows next_cursor through the paginated listing. Each page is a
+        keyset seek past the previous one, so later pages cost no more than
+        the first.
+        
+        Args:
+            branch_id: Branch ID
+            page_size: Messages fetched per request (at most 100)
+            
+        Yields:
+            Messages of the branch
+        """
+        params = {"limit": page_size}
+        while True:
+            page = self._make_request(
+                "GET", f"/v1/branches/{branch_id}/messages", _DECODE_MESSAGE_PAGE, params=params
+            )
+            for message in page.messages:
+                message.branch_id = branch_id
+                yield message
+            if not page.has_more or not page.next_cursor:
+                return
+            params["cursor"] = page.next_cursor
+    
+    def iter_messages(self, branch_id: str) -> Iterator[Message]:
+        """
+        Iterate over every message in a branch, oldest first.
+        
+        Messages are streamed as NDJSON and decoded one line at a time, so
+        memory use does not grow with the branch.
+        
+        Args:
+            branch_id: Branch ID
+            
+        Yields:
+            Messages of the branch
+        """
+        url = f"{self.base_url}/v1/branches/{branch_id}/messages:stream"
+        with self.session.get(url, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    message = _DECODE_MESSAGE.decode(line)
+                    message.branch_id = branch_id
+                    yield message
+    
     def merge(self, thread_id: str, source_branch_id: str, target_branch_id: str,
               strategy: str = "append-last", idempotency_key: Optional[str] = None) -> Merge:
         """
@@ -153,7 +341,8 @@ class ConvoHubClient:
             source_branch_id: Source branch ID
             target_branch_id: Target branch ID
             strategy: Merge strategy (append-last, resolver, etc.)
-            idempotency_key: Optional idempotency key
+            idempotency_key: Optional idempotency key; reuse it when retrying
+                the same merge (a fresh one is generated if omitted)
             
         Returns:
             Merge result
@@ -162,15 +351,33 @@ class ConvoHubClient:
             "thread_id": thread_id,
             "source_branch_id": source_branch_id,
             "target_branch_id": target_branch_id,
-            "strategy": strategy
+            "strategy": strategy,
+            # The server requires a key; without one each call is its own merge
+            "idempotency_key": idempotency_key or uuid.uuid4().hex
         }
         
-        params = {}
-        if idempotency_key:
-            params["idempotency_key"] = idempotency_key
+        return self._make_request("POST", "/v1/merge", _DECODE_MERGE, json=data)
+    
+    def merge_batch(self, thread_id: str, target_branch_id: str, sources: List[Tuple[str, str]],
+                    idempotency_key: Optional[str] = None) -> List[Merge]:
+        """
+        Merge several branches into one target in a single request.
+        
+        The server applies the merges in order, each on top of the previous
+        merge commit, and writes all of them or none.
+        
+        Args:
+            thread_id: Thread ID
+            target_branch_id: Target branch ID
+            sources: (source_branch_id, strategy) pairs, in merge order
+            idempotency_key: Optional idempotency key for the whole batch;
+                reuse it when retrying (a fresh one is generated if omitted)
             
-        response = self._make_request("POST", "/v1/merge", json=data, params=params)
-        return Merge(**response)
+        Returns:
+            One merge result per source, in order
+        """
+        data = _merge_batch_payload(thread_id, target_branch_id, sources, idempotency_key)
+        return self._make_request("POST", "/v1/merge:batch", _DECODE_MERGES, json=data)["results"]
     
     def diff(self, left_branch_id: str, right_branch_id: str, mode: DiffMode = DiffMode.MESSAGES) -> DiffResponse:
         """
@@ -182,25 +389,19 @@ class ConvoHubClient:
             mode: Diff mode (summary, messages, memory)
             
         Returns:
-            Diff response
+            Diff response; reused from cache while neither branch has changed
         """
         params = {
             "left": left_branch_id,
             "right": right_branch_id,
             "mode": mode.value
         }
+        key = (left_branch_id, right_branch_id, mode)
+        cached = self._diff_cache.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else {}
         
-        response = self._make_request("GET", "/v1/diff", params=params)
-        
-        # Convert nested objects
-        if response.get("memory_diff"):
-            response["memory_diff"] = MemoryDiff(**response["memory_diff"])
-        if response.get("summary_diff"):
-            response["summary_diff"] = SummaryDiff(**response["summary_diff"])
-        if response.get("message_ranges"):
-            response["message_ranges"] = [MessageRange(**r) for r in response["message_ranges"]]
-        
-        return DiffResponse(**response)
+        response = self.session.get(f"{self.base_url}/v1/diff", params=params, headers=headers)
+        return self._diff_cache.resolve(key, cached, response)
     
     def diff_memory(self, left_branch_id: str, right_branch_id: str) -> DiffResponse:
         """Three-way memory diff between branches"""
@@ -227,7 +428,7 @@ class ConvoHubClient:
         """
         params = {}
         if policy:
-            params["policy"] = json.dumps(policy)
+            params["policy"] = _ENCODE_JSON(policy).decode()
             
         return self._make_request("GET", f"/v1/context/{branch_id}", params=params)
     
@@ -238,3 +439,198 @@ class ConvoHubClient:
     def get_memories(self, thread_id: str) -> Dict[str, Any]:
         """Get memories for a thread"""
         return self._make_request("GET", f"/v1/threads/{thread_id}/memories")
+
+
+class AsyncConvoHubClient:
+    """
+    Asynchronous ConvoHub API client.
+    
+    Same API as ConvoHubClient with coroutine methods, on an HTTP/2
+    httpx.AsyncClient: independent calls awaited together (for example with
+    asyncio.gather) are multiplexed over one connection. Requires the
+    ``async`` extra (``pip install convohub[async]``).
+    """
+    
+    def __init__(self, base_url: str = "http://127.0.0.1:8000", api_key: Optional[str] = None):
+        """
+        Initialize the async ConvoHub client.
+        
+        Args:
+            base_url: Base URL for the ConvoHub API
+            api_key: Optional API key for authentication
+        """
+        if httpx is None:
+            raise ImportError("AsyncConvoHubClient requires httpx: pip install convohub[async]")
+        
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.session = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+            headers={"Content-Type": "application/json"},
+        )
+        self._diff_cache = _DiffCache()
+        
+        if api_key:
+            self.session.headers.update({"Authorization": f"Bearer {api_key}"})
+    
+    async def __aenter__(self) -> "AsyncConvoHubClient":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+    
+    async def aclose(self) -> None:
+        """Close the underlying connections"""
+        await self.session.aclose()
+    
+    async def _make_request(self, method: str, endpoint: str,
+                            decoder: msgspec.json.Decoder = _DECODE_JSON, **kwargs) -> Any:
+        """Make an HTTP request to the API and decode the JSON response"""
+        if "json" in kwargs:
+            kwargs["content"] = _ENCODE_JSON(kwargs.pop("json"))
+        response = await self.session.request(method, endpoint, **kwargs)
+        response.raise_for_status()
+        return decoder.decode(response.content)
+    
+    async def login(self, email: str, tenant_domain: str, password: str) -> str:
+        """Authenticate and get access token (see ConvoHubClient.login)"""
+        data = {
+            "email": email,
+            "tenant_domain": tenant_domain,
+            "password": password
+        }
+        
+        response = await self._make_request("POST", "/v1/auth/login", json=data)
+        token = response["access_token"]
+        
+        # Update session with new token
+        self.session.headers.update({"Authorization": f"Bearer {token}"})
+        return token
+    
+    async def create_thread(self, title: str, description: Optional[str] = None) -> Thread:
+        """Create a new thread"""
+        data = _compact({"title": title, "description": description})
+            
+        return await self._make_request("POST", "/v1/threads", _DECODE_THREAD, json=data)
+    
+    async def create_branch(self, thread_id: str, name: str, description: Optional[str] = None,
+                            created_from_branch_id: Optional[str] = None) -> Branch:
+        """Create a new branch"""
+        data = _compact({
+            "name": name,
+            "description": description,
+            "created_from_branch_id": created_from_branch_id,
+        })
+            
+        return await self._make_request("POST", f"/v1/threads/{thread_id}/branches", _DECODE_BRANCH, json=data)
+    
+    async def send_message(self, branch_id: str, role: str, text: str) -> Dict[str, str]:
+        """Send a message to a branch"""
+        result = (await self.send_messages_batch(branch_id, [(role, text)]))[0]
+        return {
+            "user_message_id": result["user_message_id"],
+            "assistant_message_id": result["assistant_message_id"],
+        }
+    
+    async def send_messages_batch(self, branch_id: str, messages: List[Tuple[str, ...]]) -> List[Dict[str, str]]:
+        """Send several messages to a branch in a single request"""
+        data = _batch_payload(messages)
+        response = await self._make_request("POST", f"/v1/branches/{branch_id}/messages:batch", json=data)
+        return response["results"]
+    
+    async def list_messages(self, branch_id: str, cursor: Optional[str] = None, limit: int = 50) -> Dict[str, Any]:
+        """List messages in a branch"""
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+            
+        return await self._make_request("GET", f"/v1/branches/{branch_id}/messages", params=params)
+    
+    async def iter_all_messages(self, branch_id: str, page_size: int = 100) -> AsyncIterator[Message]:
+        """Iterate over every message in a branch, following next_cursor page by page"""
+        params = {"limit": page_size}
+        while True:
+            page = await self._make_request(
+                "GET", f"/v1/branches/{branch_id}/messages", _DECODE_MESSAGE_PAGE, params=params
+            )
+            for message in page.messages:
+                message.branch_id = branch_id
+                yield message
+            if not page.has_more or not page.next_cursor:
+                return
+            params["cursor"] = page.next_cursor
+    
+    async def iter_messages(self, branch_id: str) -> AsyncIterator[Message]:
+        """Iterate over every message in a branch, streamed as NDJSON"""
+        async with self.session.stream("GET", f"/v1/branches/{branch_id}/messages:stream") as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    message = _DECODE_MESSAGE.decode(line)
+                    message.branch_id = branch_id
+                    yield message
+    
+    async def merge(self, thread_id: str, source_branch_id: str, target_branch_id: str,
+                    strategy: str = "append-last", idempotency_key: Optional[str] = None) -> Merge:
+        """Merge two branches"""
+        data = {
+            "thread_id": thread_id,
+            "source_branch_id": source_branch_id,
+            "target_branch_id": target_branch_id,
+            "strategy": strategy,
+            # The server requires a key; without one each call is its own merge
+            "idempotency_key": idempotency_key or uuid.uuid4().hex
+        }
+        
+        return await self._make_request("POST", "/v1/merge", _DECODE_MERGE, json=data)
+    
+    async def merge_batch(self, thread_id: str, target_branch_id: str, sources: List[Tuple[str, str]],
+                          idempotency_key: Optional[str] = None) -> List[Merge]:
+        """Merge several branches into one target in a single request"""
+        data = _merge_batch_payload(thread_id, target_branch_id, sources, idempotency_key)
+        response = await self._make_request("POST", "/v1/merge:batch", _DECODE_MERGES, json=data)
+        return response["results"]
+    
+    async def diff(self, left_branch_id: str, right_branch_id: str, mode: DiffMode = DiffMode.MESSAGES) -> DiffResponse:
+        """Compare two branches"""
+        params = {
+            "left": left_branch_id,
+            "right": right_branch_id,
+            "mode": mode.value
+        }
+        key = (left_branch_id, right_branch_id, mode)
+        cached = self._diff_cache.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        
+        response = await self.session.get("/v1/diff", params=params, headers=headers)
+        return self._diff_cache.resolve(key, cached, response)
+    
+    async def diff_memory(self, left_branch_id: str, right_branch_id: str) -> DiffResponse:
+        """Three-way memory diff between branches"""
+        return await self.diff(left_branch_id, right_branch_id, DiffMode.MEMORY)
+    
+    async def diff_summary(self, left_branch_id: str, right_branch_id: str) -> DiffResponse:
+        """Summary diff between branches"""
+        return await self.diff(left_branch_id, right_branch_id, DiffMode.SUMMARY)
+    
+    async def diff_messages(self, left_branch_id: str, right_branch_id: str) -> DiffResponse:
+        """Message ranges diff between branches"""
+        return await self.diff(left_branch_id, right_branch_id, DiffMode.MESSAGES)
+    
+    async def get_context(self, branch_id: str, policy: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Get conversation context for a branch"""
+        params = {}
+        if policy:
+            params["policy"] = _ENCODE_JSON(policy).decode()
+            
+        return await self._make_request("GET", f"/v1/context/{branch_id}", params=params)
+    
+    async def get_summaries(self, thread_id: str) -> Dict[str, Any]:
+        """Get summaries for a thread"""
+        return await self._make_request("GET", f"/v1/threads/{thread_id}/summaries")
+    
+    async def get_memories(self, thread_id: str) -> Dict[str, Any]:
+        """Get memories for a thread"""
+        return await self._make_request("GET", f"/v1/threads/{thread_id}/memories")
@@ -4,11 +4,12 @@ ConvoHub Python SDK Models
 Data models for the ConvoHub API.
 """
 
-from dataclasses import dataclass
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from enum import Enum
 
+import msgspec
+
 
 class DiffMode(str, Enum):
     """Diff modes for comparing branches"""
@@ -17,8 +18,7 @@ class DiffMode(str, Enum):
     MEMORY = "memory"
 
 
-@dataclass
-class Thread:
+class Thread(msgspec.Struct):
     """Thread model"""
     id: str
     title: str
@@ -29,8 +29,7 @@ class Thread:
     updated_at: Optional[datetime] = None
 
 
-@dataclass
-class Branch:
+class Branch(msgspec.Struct):
     """Branch model"""
     id: str
     thread_id: str
@@ -45,37 +44,34 @@ class Branch:
     updated_at: Optional[datetime] = None
 
 
-@dataclass
-class Message:
+class Message(msgspec.Struct):
     """Message model"""
     id: str
-    branch_id: str
     role: str
     content: Dict[str, Any]
+    branch_id: Optional[str] = None
     parent_message_id: Optional[str] = None
     tenant_id: Optional[str] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
 
-@dataclass
-class Merge:
+class Merge(msgspec.Struct):
     """Merge model"""
-    id: str
-    thread_id: str
-    source_branch_id: str
-    target_branch_id: str
-    strategy: str
-    lca_message_id: Optional[str] = None
+    id: str = msgspec.field(name="merge_id")
     merged_into_message_id: Optional[str] = None
+    thread_id: Optional[str] = None
+    source_branch_id: Optional[str] = None
+    target_branch_id: Optional[str] = None
+    strategy: Optional[str] = None
+    lca_message_id: Optional[str] = None
     conflict_resolution: Optional[Dict[str, Any]] = None
     tenant_id: Optional[str] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
 
-@dataclass
-class MemoryDiff:
+class MemoryDiff(msgspec.Struct):
     """Memory diff model"""
     added: List[Dict[str, Any]]
     removed: List[Dict[str, Any]]
@@ -83,8 +79,7 @@ class MemoryDiff:
     conflicts: List[Dict[str, Any]]
 
 
-@dataclass
-class SummaryDiff:
+class SummaryDiff(msgspec.Struct):
     """Summary diff model"""
     left_summary: Optional[str]
     right_summary: Optional[str]
@@ -93,8 +88,7 @@ class SummaryDiff:
     right_only: str
 
 
-@dataclass
-class MessageRange:
+class MessageRange(msgspec.Struct):
     """Message range model"""
     start_id: str
     end_id: str
@@ -102,8 +96,7 @@ class MessageRange:
     messages: List[Dict[str, Any]]
 
 
-@dataclass
-class DiffResponse:
+class DiffResponse(msgspec.Struct):
     """Diff response model"""
     lca: Optional[str]
     src_delta: List[str]
@@ -27,8 +27,12 @@ setup(
     python_requires=">=3.8",
     install_requires=[
         "requests>=2.25.0",
+        "msgspec>=0.18",
     ],
     extras_require={
+        "async": [
+            "httpx[http2]>=0.24.0",
+        ],
         "dev": [
             "pytest>=6.0",
             "pytest-cov>=2.0",
@@ -5,128 +5,231 @@ Script to set up PostgreSQL Row-Level Security (RLS) policies for ConvoHub.
 
 import os
 import sys
-from sqlalchemy import create_engine, text
+import textwrap
+from sqlalchemy import create_engine
 from app.core.settings import settings
 
+# STABLE accessors for the session settings, so the setting lookup and uuid
+# cast live in one place and the planner may treat them as constant per query
+_SETTING_FUNCTIONS = [
+    """
+    CREATE OR REPLACE FUNCTION app_current_tenant_id() RETURNS uuid
+    LANGUAGE sql STABLE
+    AS $$ SELECT current_setting('app.current_tenant_id')::uuid $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION app_current_user_id() RETURNS uuid
+    LANGUAGE sql STABLE
+    AS $$ SELECT current_setting('app.current_user_id')::uuid $$
+    """,
+]
+
+# Policies call them through scalar subqueries: PostgreSQL evaluates those
+# once per query as InitPlans instead of once per row
+_CURRENT_TENANT = "(SELECT app_current_tenant_id())"
+_CURRENT_USER = "(SELECT app_current_user_id())"
+
+_TENANT_PREDICATE = f"tenant_id = {_CURRENT_TENANT}"
+
+# tenants rows are the tenant itself
+_TENANT_ROW_PREDICATE = f"id = {_CURRENT_TENANT}"
+
+# A thread is visible to its owner and its collaborators. Collaborators are
+# checked with their own EXISTS so the lookup is a semi-join on
+# uq_thread_collaborator (thread_id, user_id) that only runs when the user is
+# not the owner. thread_collaborators' own policy must therefore never read
+# threads, or PostgreSQL would recurse between the two policies.
+_THREAD_ACCESS = """{alias}.tenant_id = {current_tenant}
+    AND (
+        {alias}.owner_id = {current_user}
+        OR EXISTS (
+            SELECT 1 FROM thread_collaborators tc
+            WHERE tc.thread_id = {alias}.id
+            AND tc.user_id = {current_user}
+        )
+    )"""
+
+# How a row reached through a foreign key resolves its thread, keyed by the
+# table the key points at: (FROM clause, alias of that table)
+_JOIN_PATHS = {
+    "threads": ("threads t", "t"),
+    "branches": ("branches b\n    JOIN threads t ON t.id = b.thread_id", "b"),
+    "messages": (
+        "messages m\n    JOIN branches b ON b.id = m.branch_id\n    JOIN threads t ON t.id = b.thread_id",
+        "m",
+    ),
+}
+
+_ACCESS_PREDICATE = """EXISTS (
+    SELECT 1 FROM {from_clause}
+    WHERE {join_alias}.id = {table}.{fk_col}
+    AND {thread_access}
+)"""
+
+def _thread_access(alias):
+    """Return the owner-or-collaborator predicate for the thread aliased as alias."""
+    return _THREAD_ACCESS.format(
+        alias=alias, current_tenant=_CURRENT_TENANT, current_user=_CURRENT_USER
+    )
+
+def _access_predicate(table, fk_col, join_table):
+    """Return the owner-or-collaborator predicate for rows reached via fk_col.
+
+    The row's thread is resolved through the join path of the table fk_col
+    points at, so branches go through their thread_id and messages through
+    their branch.
+    """
+    from_clause, join_alias = _JOIN_PATHS[join_table]
+    return _ACCESS_PREDICATE.format_map({
+        "table": table,
+        "fk_col": fk_col,
+        "from_clause": from_clause,
+        "join_alias": join_alias,
+        "thread_access": _thread_access("t"),
+    })
+
+# Tables RLS is enabled on
+_RLS_TABLES = (
+    'tenants', 'users', 'threads', 'branches', 'messages',
+    'edges', 'merges', 'summaries', 'memories', 'idempotency_records',
+    'thread_collaborators',
+)
+
+# Tables whose rows carry their own tenant_id and are shared across the tenant
+_TENANT_TABLES = ('users', 'idempotency_records', 'thread_collaborators')
+
+# (tables, foreign key column, table it points at)
+_ACCESS_RULES = (
+    (('branches', 'merges', 'summaries', 'memories'), 'thread_id', 'threads'),
+    (('messages',), 'branch_id', 'branches'),
+    (('edges',), 'from_message_id', 'messages'),
+)
+
+def _policies_by_table():
+    """Map each table to the predicates its access policy ORs together."""
+    # Every permissive policy on a table is evaluated for every row, so
+    # each table gets a single policy OR-ing all predicates it qualifies for
+    policies_by_table: dict[str, list[str]] = {
+        "tenants": [_TENANT_ROW_PREDICATE],
+        "threads": [_thread_access("threads")],
+    }
+    for table in _TENANT_TABLES:
+        policies_by_table.setdefault(table, []).append(_TENANT_PREDICATE)
+    for tables, fk_col, join_table in _ACCESS_RULES:
+        for table in tables:
+            policies_by_table.setdefault(table, []).append(
+                _access_predicate(table, fk_col, join_table)
+            )
+    return policies_by_table
+
+ENABLE_RLS_LABEL = "Enabled RLS"
+
+def _build_sections():
+    """Yield (label, statements) for each independently applied DDL section, in order."""
+    yield "Setting functions", tuple(_SETTING_FUNCTIONS)
+    for table, predicates in _policies_by_table().items():
+        condition = " OR ".join(f"({predicate})" for predicate in predicates)
+        yield f"Access policy for {table}", (
+            # Policies from earlier setups would otherwise stay in force alongside the combined one
+            *(f"DROP POLICY IF EXISTS {table}_{old_policy} ON {table}"
+              for old_policy in ('tenant_policy', 'thread_policy', 'branch_policy', 'combined_policy')),
+            # A FOR ALL policy without WITH CHECK applies its USING
+            # expression to new rows too; reads never evaluate WITH CHECK
+            f"""
+                CREATE POLICY {table}_combined_policy ON {table}
+                FOR ALL
+                USING ({condition})
+                """,
+        )
+    # Covering indexes for the policy probes. The EXISTS subqueries look
+    # threads and branches up by primary key and then read the tenant and
+    # owner/thread columns, which these let PostgreSQL answer from the index
+    # alone. thread_collaborators (thread_id, user_id) is already indexed
+    # by the schema.
+    yield "RLS covering indexes", (
+        "CREATE INDEX IF NOT EXISTS ix_threads_rls ON threads (id) INCLUDE (tenant_id, owner_id)",
+        "CREATE INDEX IF NOT EXISTS ix_branches_rls ON branches (id) INCLUDE (tenant_id, thread_id)",
+    )
+    # Last, so a table is only locked down once every policy is in place
+    yield ENABLE_RLS_LABEL, tuple(
+        f"ALTER TABLE {table} ENABLE ROW LEVEL SECURITY" for table in _RLS_TABLES
+    )
+
+# Everything is built once at import; running the setup is plain iteration
+RLS_SECTIONS: tuple[tuple[str, tuple[str, ...]], ...] = tuple(_build_sections())
+RLS_STATEMENTS: tuple[str, ...] = tuple(
+    statement for _, statements in RLS_SECTIONS for statement in statements
+)
+_POLICY_TABLES = frozenset(_policies_by_table())
+
+def _run_statements(conn, label, statements):
+    """Send one section of DDL to the server as a single pipeline.
+
+    The section runs in its own transaction block, so a failing statement
+    rolls back only that section. Returns whether the section applied.
+    """
+    try:
+        with conn.transaction(), conn.pipeline():
+            cur = conn.cursor()
+            for statement in statements:
+                cur.execute(statement)
+        print(f"  ✓ {label} ({len(statements)} statements)")
+        return True
+    except Exception as e:
+        print(f"  ✗ Could not apply {label}: {e}")
+        return False
+
 def setup_rls():
-    """Set up RLS policies for the application."""
+    """Set up RLS policies for the application.
+
+    Returns False if any section failed. RLS is then left disabled, since
+    enabling it on a table without its policy would deny every row.
+    """
     
     # Create database engine
     engine = create_engine(settings.DATABASE_URL)
     
-    with engine.connect() as conn:
-        # Enable RLS on all tables
-        tables_with_tenant = [
-            'tenants', 'users', 'threads', 'branches', 'messages', 
-            'edges', 'merges', 'summaries', 'memories', 'idempotency_records',
-            'thread_collaborators'
-        ]
+    # Work on the underlying psycopg connection so each section's DDL goes out
+    # in one pipelined round-trip instead of one round-trip per statement
+    raw = engine.raw_connection()
+    try:
+        conn = raw.driver_connection
+        print("Applying RLS setup...")
+        failed = []
+        for label, statements in RLS_SECTIONS:
+            if label == ENABLE_RLS_LABEL and failed:
+                print(f"  ✗ Skipped {label}: earlier sections failed")
+                continue
+            if not _run_statements(conn, label, statements):
+                failed.append(label)
         
-        print("Enabling RLS on tables...")
-        for table in tables_with_tenant:
-            try:
-                conn.execute(text(f"ALTER TABLE {table} ENABLE ROW LEVEL SECURITY"))
-                print(f"  ✓ Enabled RLS on {table}")
-            except Exception as e:
-                print(f"  ⚠ Warning: Could not enable RLS on {table}: {e}")
-        
-        # Create tenant-based policies
-        print("\nCreating tenant-based policies...")
-        tenant_tables = ['tenants', 'users', 'idempotency_records']
-        for table in tenant_tables:
-            try:
-                policy_sql = f"""
-                CREATE POLICY {table}_tenant_policy ON {table}
-                FOR ALL
-                USING (tenant_id = current_setting('app.current_tenant_id')::uuid)
-                WITH CHECK (tenant_id = current_setting('app.current_tenant_id')::uuid)
-                """
-                conn.execute(text(policy_sql))
-                print(f"  ✓ Created tenant policy for {table}")
-            except Exception as e:
-                print(f"  ⚠ Warning: Could not create tenant policy for {table}: {e}")
-        
-        # Create thread-based access policies
-        print("\nCreating thread-based access policies...")
-        thread_tables = ['threads', 'thread_collaborators', 'merges', 'summaries', 'memories']
-        for table in thread_tables:
-            try:
-                policy_sql = f"""
-                CREATE POLICY {table}_thread_policy ON {table}
-                FOR ALL
-                USING (
-                    EXISTS (
-                        SELECT 1 FROM threads t
-                        LEFT JOIN thread_collaborators tc ON t.id = tc.thread_id
-                        WHERE t.id = {table}.thread_id
-                        AND (
-                            t.owner_id = current_setting('app.current_user_id')::uuid
-                            OR tc.user_id = current_setting('app.current_user_id')::uuid
-                        )
-                        AND t.tenant_id = current_setting('app.current_tenant_id')::uuid
-                    )
-                )
-                WITH CHECK (
-                    EXISTS (
-                        SELECT 1 FROM threads t
-                        LEFT JOIN thread_collaborators tc ON t.id = tc.thread_id
-                        WHERE t.id = {table}.thread_id
-                        AND (
-                            t.owner_id = current_setting('app.current_user_id')::uuid
-                            OR tc.user_id = current_setting('app.current_user_id')::uuid
-                        )
-                        AND t.tenant_id = current_setting('app.current_tenant_id')::uuid
-                    )
-                )
-                """
-                conn.execute(text(policy_sql))
-                print(f"  ✓ Created thread policy for {table}")
-            except Exception as e:
-                print(f"  ⚠ Warning: Could not create thread policy for {table}: {e}")
-        
-        # Create branch-based access policies
-        print("\nCreating branch-based access policies...")
-        branch_tables = ['branches', 'messages', 'edges']
-        for table in branch_tables:
-            try:
-                policy_sql = f"""
-                CREATE POLICY {table}_branch_policy ON {table}
-                FOR ALL
-                USING (
-                    EXISTS (
-                        SELECT 1 FROM branches b
-                        JOIN threads t ON b.thread_id = t.id
-                        LEFT JOIN thread_collaborators tc ON t.id = tc.thread_id
-                        WHERE b.id = {table}.branch_id
-                        AND (
-                            t.owner_id = current_setting('app.current_user_id')::uuid
-                            OR tc.user_id = current_setting('app.current_user_id')::uuid
-                        )
-                        AND b.tenant_id = current_setting('app.current_tenant_id')::uuid
-                    )
-                )
-                WITH CHECK (
-                    EXISTS (
-                        SELECT 1 FROM branches b
-                        JOIN threads t ON b.thread_id = t.id
-                        LEFT JOIN thread_collaborators tc ON t.id = tc.thread_id
-                        WHERE b.id = {table}.branch_id
-                        AND (
-                            t.owner_id = current_setting('app.current_user_id')::uuid
-                            OR tc.user_id = current_setting('app.current_user_id')::uuid
-                        )
-                        AND b.tenant_id = current_setting('app.current_tenant_id')::uuid
-                    )
-                )
-                """
-                conn.execute(text(policy_sql))
-                print(f"  ✓ Created branch policy for {table}")
-            except Exception as e:
-                print(f"  ⚠ Warning: Could not create branch policy for {table}: {e}")
+        # Each table should now carry exactly one policy
+        counts = conn.execute(
+            "SELECT tablename, COUNT(*) FROM pg_policies GROUP BY 1"
+        ).fetchall()
+        for table, count in counts:
+            if table in _POLICY_TABLES and count != 1:
+                print(f"  ⚠ Warning: {table} has {count} policies")
         
         # Commit all changes
         conn.commit()
+        if failed:
+            print(f"\n❌ RLS setup failed: {', '.join(failed)}")
+            return False
         print("\n✅ RLS setup completed successfully!")
+        return True
+    finally:
+        raw.close()
 
 if __name__ == "__main__":
-    setup_rls()
+    # Print the script instead of applying it, e.g. for psql -f
+    if "--sql" in sys.argv[1:]:
+        for statement in RLS_STATEMENTS:
+            print(textwrap.dedent(statement).strip() + ";\n")
+        sys.exit(0)
+    # For scripts that provision test or CI databases: a uniformly privileged
+    # test session gains nothing from policies but their per-row cost
+    if os.environ.get("CONVOHUB_SKIP_RLS") == "1":
+        print("CONVOHUB_SKIP_RLS=1, skipping RLS setup")
+        sys.exit(0)
+    sys.exit(0 if setup_rls() else 1)
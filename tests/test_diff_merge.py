@@ -1,16 +1,11 @@
 # tests/test_diff_merge.py
-def _mk_thread_branch(client, title, name):
-    t = client.post("/v1/threads", json={"title": title}).json()
-    b = client.post(f"/v1/threads/{t['id']}/branches", json={"name": name}).json()
-    return t["id"], b["id"]
-
 def _say(client, branch_id, text):
     r = client.post(f"/v1/branches/{branch_id}/messages", json={"role": "user", "text": text})
     assert r.status_code == 200
     return r.json()
 
-def test_diff_and_merge_happy_path(client):
-    thread_id, main_id = _mk_thread_branch(client, "MergeX", "main")
+def test_diff_and_merge_happy_path(client, make_branch):
+    thread_id, main_id = make_branch("MergeX", "main")
     # fork another branch from main tip
     ids = _say(client, main_id, "main-ctx")
     tip = ids["assistant_message_id"]
@@ -48,3 +43,45 @@ def test_diff_and_merge_happy_path(client):
     # last message should be assistant + origin merge (origin not in response; check text)
     assert msgs[-1]["role"] == "assistant"
     assert "merge" in msgs[-1]["content"]["text"]
+
+def test_diff_etag_revalidation(client, make_branch):
+    thread_id, main_id = make_branch("DiffETag", "main")
+    say = lambda branch_id, text: client.post(
+        f"/v1/branches/{branch_id}/messages", json={"role": "user", "text": text}
+    ).json()
+    tip = say(main_id, "main-ctx")["assistant_message_id"]
+    idea_id = client.post(
+        f"/v1/threads/{thread_id}/branches",
+        json={"name": "idea", "created_from_branch_id": main_id, "created_from_message_id": tip},
+    ).json()["id"]
+    say(idea_id, "idea 2")
+
+    params = {"left": main_id, "right": idea_id, "mode": "memory"}
+    d = client.get("/v1/diff", params=params)
+    assert d.status_code == 200
+    etag = d.headers["ETag"]
+
+    # unchanged branches: the cached diff is still current
+    again = client.get("/v1/diff", params=params, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+    # a turn on another branch of the thread updates the thread's memories
+    _, other_id = make_branch(name="other", thread_id=thread_id)
+    say(other_id, "I prefer answers as short bullet lists.")
+    moved = client.get("/v1/diff", params=params, headers={"If-None-Match": etag})
+    assert moved.status_code == 200
+    etag = moved.headers["ETag"]
+
+    # If-None-Match may list several ETags
+    listed = client.get("/v1/diff", params=params, headers={"If-None-Match": f'W/"other", {etag}'})
+    assert listed.status_code == 304
+
+    # another mode is a different representation
+    other = client.get("/v1/diff", params={**params, "mode": "summary"}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+    # advancing a branch invalidates the ETag
+    say(idea_id, "idea 3")
+    stale = client.get("/v1/diff", params=params, headers={"If-None-Match": etag})
+    assert stale.status_code == 200
+    assert stale.headers["ETag"] != etag
@@ -4,11 +4,9 @@ def _say(client, branch_id, text):
     assert r.status_code == 200
     return r.json()
 
-def test_fork_from_message_copies_snapshot(client):
+def test_fork_from_message_copies_snapshot(client, make_branch):
     # base thread/branch
-    t = client.post("/v1/threads", json={"title": "Forky"}).json()
-    b = client.post(f"/v1/threads/{t['id']}/branches", json={"name": "main"}).json()
-    branch_id = b["id"]
+    thread_id, branch_id = make_branch("Forky", "main")
 
     # produce a user + assistant pair so we have a snapshot on the assistant message
     ids = _say(client, branch_id, "context 1")
@@ -16,7 +14,7 @@ def test_fork_from_message_copies_snapshot(client):
 
     # create a new branch from that message
     new_branch = client.post(
-        f"/v1/threads/{t['id']}/branches",
+        f"/v1/threads/{thread_id}/branches",
         json={"name": "idea-A", "created_from_branch_id": branch_id, "created_from_message_id": tip_assistant_id},
     ).json()
 
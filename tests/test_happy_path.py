@@ -31,3 +31,23 @@ def test_branch_chat_and_list(client):
     assert roles[2] == "assistant"
     # Parent linkage check
     assert msgs[2]["parent_message_id"] == msgs[1]["id"]
+
+def test_stream_branch_messages(client, make_branch, monkeypatch):
+    import json
+    from app.routers import messages as messages_router
+    # Small chunks so the stream spans several keyset queries
+    monkeypatch.setattr(messages_router, "STREAM_CHUNK_SIZE", 2)
+
+    _, branch_id = make_branch("Stream", "main")
+    for text in ("one", "two"):
+        client.post(f"/v1/branches/{branch_id}/messages", json={"role": "user", "text": text})
+
+    r = client.get(f"/v1/branches/{branch_id}/messages:stream")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    streamed = [json.loads(line) for line in r.text.splitlines()]
+
+    page = client.get(f"/v1/branches/{branch_id}/messages", params={"limit": 100}).json()
+    assert [m["id"] for m in streamed] == [m["id"] for m in page["messages"]]
+
+    assert client.get("/v1/branches/missing/messages:stream").status_code == 404
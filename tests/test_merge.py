@@ -1,25 +1,12 @@
-def _make_branch(client, name="main"):
-    t = client.post("/v1/threads", json={"title": "T"}).json()
-    thread_id = t["id"]
-    b = client.post(f"/v1/threads/{thread_id}/branches", json={"name": name}).json()
-    return thread_id, b["id"]
-
 def _say(client, branch_id, text):
     r = client.post(f"/v1/branches/{branch_id}/messages", json={"role": "user", "text": text})
     assert r.status_code == 200
     return r.json()
 
-def test_placeholder_merge_commit(client):
-    # create two branches in same thread
-    thread_id, main_id = _make_branch(client, "main")
-    _, idea_id = _make_branch(client, "idea-A")  # (separate branch in a separate thread would fail merge)
-    # NOTE: merges expect same thread; use two branches under same thread instead:
-    # Let's do it correctly:
-    t = client.post("/v1/threads", json={"title": "Thread"}).json()
-    thread_id = t["id"]
-    main = client.post(f"/v1/threads/{thread_id}/branches", json={"name": "main"}).json()
-    idea = client.post(f"/v1/threads/{thread_id}/branches", json={"name": "idea-A"}).json()
-    main_id, idea_id = main["id"], idea["id"]
+def test_placeholder_merge_commit(client, make_branch):
+    # create two branches in same thread (merges expect same thread)
+    thread_id, main_id = make_branch("Thread", "main")
+    _, idea_id = make_branch(name="idea-A", thread_id=thread_id)
 
     # diverge both
     _say(client, main_id, "Main work 1")
@@ -40,3 +27,34 @@ def test_placeholder_merge_commit(client):
     msgs = client.get(f"/v1/branches/{main_id}/messages").json()
     texts = [m["content"]["text"] for m in msgs if m["role"] == "assistant"]
     assert any("merged" in t for t in texts)
+
+def test_merge_batch_stacks_merge_commits(client, make_branch):
+    thread_id, main_id = make_branch("Batch", "main")
+    client.post(f"/v1/branches/{main_id}/messages", json={"role": "user", "text": "Root"})
+    source_ids = []
+    for name in ("idea-A", "idea-B"):
+        b = client.post(f"/v1/threads/{thread_id}/branches",
+                        json={"name": name, "created_from_branch_id": main_id}).json()
+        client.post(f"/v1/branches/{b['id']}/messages", json={"role": "user", "text": f"{name} work"})
+        source_ids.append(b["id"])
+
+    body = {
+        "thread_id": thread_id,
+        "target_branch_id": main_id,
+        "merges": [{"source_branch_id": s, "strategy": "hybrid"} for s in source_ids],
+        "idempotency_key": "merge-batch-test-0001",
+    }
+    m = client.post("/v1/merge:batch", json=body)
+    assert m.status_code == 201
+    results = m.json()["results"]
+    assert len(results) == 2
+
+    # each merge commit sits on top of the previous one, in submission order
+    msgs = client.get(f"/v1/branches/{main_id}/messages", params={"limit": 100}).json()["messages"]
+    assert [msg["id"] for msg in msgs[-2:]] == [r["merged_into_message_id"] for r in results]
+    assert msgs[-1]["parent_message_id"] == msgs[-2]["id"]
+
+    # retrying with the same key replays the result instead of merging again
+    again = client.post("/v1/merge:batch", json=body)
+    assert again.json() == m.json()
+    assert len(client.get(f"/v1/branches/{main_id}/messages", params={"limit": 100}).json()["messages"]) == len(msgs)
@@ -1,16 +1,45 @@
 # tests/test_messages_atomic.py
 from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+
+from app.models import Branch, Message
+from app.rate_limiting import quota_manager
 from app.routers import messages as messages_router
 
-def test_chat_turn_atomic_on_failure(client, monkeypatch):
+def boom(_history):
+    raise RuntimeError("kaboom")
+
+def test_atomic_chat_turns_roll_back_on_failure(db_session, make_branch, tenant_context, monkeypatch):
+    _, branch_id = make_branch("Atomic", "main")
+    branch = db_session.get(Branch, branch_id)
+    roles = lambda: db_session.scalars(select(Message.role).where(Message.branch_id == branch_id)).all()
+
+    monkeypatch.setattr(messages_router, "assistant_reply", boom)
+    with pytest.raises(RuntimeError):
+        messages_router._atomic_chat_turns(db_session, tenant_context, branch, ["Hello"])
+    # the user message flushed before the failure must not survive
+    assert roles() == ["system"]
+
+    # a batch whose second turn fails keeps nothing from the first either
+    answered = []
+    def reply_once(history):
+        if answered:
+            boom(history)
+        answered.append(history)
+        return "first reply"
+    monkeypatch.setattr(messages_router, "assistant_reply", reply_once)
+    with pytest.raises(RuntimeError):
+        messages_router._atomic_chat_turns(db_session, tenant_context, branch, ["one", "two"])
+    assert roles() == ["system"]
+
+@pytest.mark.integration
+def test_chat_turn_atomic_on_failure(client, make_branch, monkeypatch):
     # thread + branch
-    t = client.post("/v1/threads", json={"title": "Atomic"}).json()
-    b = client.post(f"/v1/threads/{t['id']}/branches", json={"name": "main"}).json()
-    branch_id = b["id"]
+    _, branch_id = make_branch("Atomic", "main")
 
     # Break assistant_reply to raise (after user message would be added if not atomic)
-    def boom(_history):
-        raise RuntimeError("kaboom")
     monkeypatch.setattr(messages_router, "assistant_reply", boom)
 
     r = client.post(f"/v1/branches/{branch_id}/messages", json={"role": "user", "text": "Hello"})
@@ -20,3 +49,19 @@ def test_chat_turn_atomic_on_failure(client, monkeypatch):
     msgs = client.get(f"/v1/branches/{branch_id}/messages").json()
     roles = [m["role"] for m in msgs]
     assert roles == ["system"]  # no user/assistant messages persisted
+
+@pytest.mark.integration
+def test_send_over_quota_writes_nothing(client, db_session, make_branch, monkeypatch):
+    _, branch_id = make_branch("Quota", "main")
+    roles = lambda: db_session.scalars(select(Message.role).where(Message.branch_id == branch_id)).all()
+    # room for exactly one turn (user + assistant)
+    monkeypatch.setitem(quota_manager.quotas["default"], "messages_per_day", 2)
+
+    r = client.post(f"/v1/branches/{branch_id}/messages", json={"role": "user", "text": "one"})
+    assert r.status_code == 201
+    assert r.headers["X-RateLimit-Limit"] == "2"
+    assert r.headers["X-RateLimit-Remaining"] == "0"
+
+    r = client.post(f"/v1/branches/{branch_id}/messages", json={"role": "user", "text": "two"})
+    assert r.status_code == 429
+    assert roles() == ["system", "user", "assistant"]